@@ -0,0 +1,111 @@
+from itertools import chain
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from .models import Enrollment, Lesson
+
+FETCH_CHUNK = 100_000
+
+PERCENTILES = (25, 50, 75, 90)
+# Histogram bins of 10 points; 100% falls in the last bin
+HISTOGRAM_BINS = 10
+# Lesson indices are spaced this far apart in the combined sort key (> max progress)
+KEY_STRIDE = 128.0
+
+
+def fetch_columns(db: Session, statement: Select, dtype=np.float64) -> np.ndarray:
+    """Run a SELECT of numeric columns and return its rows as a 2-D array.
+
+    Rows come straight off the DB-API cursor in chunks and are flattened with
+    ``np.fromiter``; building SQLAlchemy Row objects for millions of rows is
+    several times slower. Column type processing is bypassed, so only select
+    plain numeric columns.
+    """
+    width = len(statement.selected_columns)
+    connection = db.connection()
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    cursor = connection.connection.cursor()
+    parts = []
+    try:
+        cursor.execute(str(compiled), params)
+        while True:
+            rows = cursor.fetchmany(FETCH_CHUNK)
+            if not rows:
+                break
+            parts.append(
+                np.fromiter(chain.from_iterable(rows), dtype=dtype, count=len(rows) * width)
+            )
+    finally:
+        cursor.close()
+    if not parts:
+        return np.empty((0, width), dtype=dtype)
+    return np.concatenate(parts).reshape(-1, width)
+
+
+def progress_distribution(lesson_ids: np.ndarray, progress: np.ndarray) -> Dict[int, dict]:
+    """Per-lesson progress statistics for parallel (lesson id, progress) arrays.
+
+    Everything is computed for all lessons at once: one sort of a combined
+    (lesson, progress) key gives per-lesson order statistics, and bincounts
+    give means, histograms and completion rates.
+    """
+    if len(lesson_ids) == 0:
+        return {}
+    # Ids are small positive integers: a bincount is much cheaper than np.unique
+    counts = np.bincount(lesson_ids)
+    lessons = np.flatnonzero(counts)
+    n = len(lessons)
+    remap = np.zeros(len(counts), dtype=np.int64)
+    remap[lessons] = np.arange(n)
+    index = remap[lesson_ids]
+    sizes = counts[lessons]
+    progress = np.clip(progress, 0, 100)
+    starts = np.cumsum(sizes) - sizes
+
+    ordered = np.sort(index * KEY_STRIDE + progress)
+    ordered -= np.repeat(np.arange(n) * KEY_STRIDE, sizes)
+    percentiles = {}
+    for q in PERCENTILES:
+        # Linear interpolation between closest ranks, as np.percentile does
+        position = starts + (sizes - 1) * (q / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts + sizes - 1)
+        fraction = position - low
+        percentiles[q] = ordered[low] * (1 - fraction) + ordered[high] * fraction
+
+    bins = np.minimum((progress // (100 / HISTOGRAM_BINS)).astype(np.int64), HISTOGRAM_BINS - 1)
+    histogram = np.bincount(index * HISTOGRAM_BINS + bins, minlength=n * HISTOGRAM_BINS)
+    histogram = histogram.reshape(n, HISTOGRAM_BINS)
+    completed = np.bincount(index, weights=progress >= 100, minlength=n)
+    averages = np.bincount(index, weights=progress, minlength=n) / sizes
+    # Share of learners who reached at least 0%, 10%, ..., 90% of the lesson, then 100%
+    reached = np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1] / sizes[:, None]
+    reached = np.hstack([reached, (completed / sizes)[:, None]])
+
+    stats = {}
+    for i, lesson_id in enumerate(lessons.tolist()):
+        stats[lesson_id] = {
+            "enrollments": int(sizes[i]),
+            "average": round(float(averages[i]), 2),
+            **{f"p{q}": round(float(percentiles[q][i]), 2) for q in PERCENTILES},
+            "completion_rate": round(float(completed[i] / sizes[i]), 4),
+            "histogram": histogram[i].tolist(),
+            "reached": [round(share, 4) for share in reached[i].tolist()],
+        }
+    return stats
+
+
+def lesson_progress_stats(db: Session) -> List[dict]:
+    """Progress distribution of every lesson, from one pass over enrollments."""
+    rows = fetch_columns(db, select(Enrollment.lesson_id, Enrollment.progress_percent))
+    stats = progress_distribution(rows[:, 0].astype(np.int64), rows[:, 1])
+    return [
+        {"lesson_id": lesson_id, "title": title, **stats.get(lesson_id, {"enrollments": 0})}
+        for lesson_id, title in db.query(Lesson.id, Lesson.title).order_by(Lesson.id)
+    ]
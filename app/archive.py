@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert, literal, select, text, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .jobs import job
+from .models import ArchivedQuizSubmission, QuizAttemptSummary, QuizSubmission
+
+BATCH_SIZE = 1000
+
+HISTORY_COLUMNS = ("id", "quiz_id", "user_id", "score", "submitted_at", "responses")
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(start: datetime) -> datetime:
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def ensure_partitions(db: Session, months: Iterable[datetime]) -> None:
+    """Create the monthly archive partitions on PostgreSQL; a no-op elsewhere."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for start in sorted(set(months)):
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS quiz_submissions_archive_{start:%Y_%m} "
+            f"PARTITION OF quiz_submissions_archive "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{_next_month(start):%Y-%m-%d}')"
+        ))
+
+
+def submission_history():
+    """Hot and archived submissions as one subquery with QuizSubmission's columns.
+
+    Use it for anything that must see every attempt, e.g.
+    ``history = submission_history(); db.query(history.c.score).filter(...)``.
+    """
+    return union_all(
+        select(*(getattr(QuizSubmission, name) for name in HISTORY_COLUMNS)),
+        select(*(getattr(ArchivedQuizSubmission, name) for name in HISTORY_COLUMNS)),
+    ).subquery("submission_history")
+
+
+@job("submissions.archive")
+def archive_submissions(
+    db: Session, older_than_days: Optional[int] = None, batch_size: int = BATCH_SIZE
+):
+    """Move submissions older than the cutoff to the archive, one batch per transaction.
+
+    Each batch copies the rows, folds them into QuizAttemptSummary and deletes
+    them from the hot table in the same commit, so readers combining the hot
+    table with the summaries never double count or miss an attempt.
+    """
+    if older_than_days is None:
+        older_than_days = settings.submission_archive_after_days
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        rows = (
+            db.query(
+                QuizSubmission.id,
+                QuizSubmission.user_id,
+                QuizSubmission.quiz_id,
+                QuizSubmission.score,
+                QuizSubmission.submitted_at,
+            )
+            .filter(QuizSubmission.submitted_at < cutoff)
+            .order_by(QuizSubmission.submitted_at, QuizSubmission.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        ensure_partitions(db, (_month_start(row.submitted_at) for row in rows))
+
+        db.execute(
+            insert(ArchivedQuizSubmission).from_select(
+                [*HISTORY_COLUMNS, "archived_at"],
+                select(
+                    *(getattr(QuizSubmission, name) for name in HISTORY_COLUMNS),
+                    literal(datetime.utcnow(), ArchivedQuizSubmission.archived_at.type),
+                ).where(QuizSubmission.id.in_(ids)),
+            )
+        )
+
+        totals = {}
+        for row in rows:
+            attempts, best, last = totals.get((row.user_id, row.quiz_id), (0, row.score, row.submitted_at))
+            totals[(row.user_id, row.quiz_id)] = (
+                attempts + 1, max(best, row.score), max(last, row.submitted_at)
+            )
+        existing = {
+            (summary.user_id, summary.quiz_id): summary
+            for summary in db.query(QuizAttemptSummary).filter(
+                tuple_(QuizAttemptSummary.user_id, QuizAttemptSummary.quiz_id).in_(list(totals))
+            )
+        }
+        for (user_id, quiz_id), (attempts, best, last) in totals.items():
+            summary = existing.get((user_id, quiz_id))
+            if summary is None:
+                db.add(QuizAttemptSummary(
+                    user_id=user_id,
+                    quiz_id=quiz_id,
+                    attempts=attempts,
+                    best_score=best,
+                    last_submitted_at=last,
+                ))
+            else:
+                summary.attempts += attempts
+                summary.best_score = max(summary.best_score, best)
+                summary.last_submitted_at = max(summary.last_submitted_at, last)
+
+        db.query(QuizSubmission).filter(QuizSubmission.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        archived += len(ids)
+    return {"archived": archived, "cutoff": cutoff}
+
+
+def total_attempts(db: Session) -> int:
+    """Number of submissions ever made, without scanning the archive."""
+    hot = db.query(func.count(QuizSubmission.id)).scalar()
+    archived = db.query(func.coalesce(func.sum(QuizAttemptSummary.attempts), 0)).scalar()
+    return hot + archived
@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .config import settings
+
+
+class TTLCache:
+    """Small thread-safe in-process cache with per-entry expiry."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                self._evict_expired()
+                if len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+
+
+# Per-user learner dashboard payloads, see routers/users.py
+dashboard_cache = TTLCache(ttl_seconds=settings.dashboard_cache_ttl_seconds)
+
+# Precompressed GET /lessons/{id} bodies, see routers/lessons.py
+lesson_response_cache = TTLCache(ttl_seconds=settings.lesson_cache_ttl_seconds)
+
+
+def invalidate_lesson(lesson_id: int) -> None:
+    for fmt in ("markdown", "html"):
+        lesson_response_cache.invalidate((lesson_id, fmt))
+
+# Per-lesson progress distribution report, see routers/admin.py
+progress_stats_cache = TTLCache(ttl_seconds=settings.progress_stats_cache_ttl_seconds)
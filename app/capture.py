@@ -0,0 +1,172 @@
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+# Bodies larger than this are recorded by size only
+MAX_BODY_BYTES = 1024 * 1024
+# Longest query parameter value kept
+MAX_PARAM_LENGTH = 200
+# Values under these keys are never written, whatever their type
+SENSITIVE_KEYS = {"password", "current_password", "new_password", "token", "access_token",
+                  "refresh_token", "secret", "code"}
+# String values kept as-is: enum-like fields a replay needs to stay valid
+KEPT_STRING_KEYS = {"role", "level", "grant_type"}
+REDACTED = "<redacted>"
+DATETIME = "<datetime>"
+
+
+def string_placeholder(value: str) -> str:
+    if len(value) >= 10 and value[4:5] == "-":
+        try:
+            datetime.fromisoformat(value)
+            return DATETIME
+        except ValueError:
+            pass
+    return f"<str:{len(value)}>"
+
+
+def body_shape(value: Any, key: Optional[str] = None) -> Any:
+    """A JSON value with strings replaced by ``<str:N>`` (or ``<datetime>``)
+    and sensitive values redacted. Numbers, booleans and list lengths are kept, so ids and
+    batch sizes survive for replay."""
+    if key in SENSITIVE_KEYS:
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: body_shape(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [body_shape(item) for item in value]
+    if isinstance(value, str):
+        return value if key in KEPT_STRING_KEYS else string_placeholder(value)
+    return value
+
+
+def user_alias(authorization: Optional[str]) -> Optional[str]:
+    """A stable pseudonym for the bearer token's user; the token itself is never written."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        subject = str(jwt.decode(token, settings.secret_key, algorithms=["HS256"])["sub"])
+    except (JWTError, KeyError):
+        return "invalid"
+    return hmac.new(settings.secret_key.encode(), subject.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def request_record(scope: Scope, body: bytes, body_size: int) -> dict:
+    headers = Headers(scope=scope)
+    route = scope.get("route")
+    query = {
+        key: REDACTED if key in SENSITIVE_KEYS else value[:MAX_PARAM_LENGTH]
+        for key, value in parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+    }
+    record = {
+        "method": scope["method"],
+        # The route template, e.g. /lessons/{lesson_id}; None when nothing matched
+        "route": getattr(route, "path", None),
+        "path_params": scope.get("path_params", {}),
+        "query": query,
+        "user": user_alias(headers.get("authorization")),
+        "body": None,
+    }
+    if body_size:
+        content_type = headers.get("content-type", "").partition(";")[0].strip()
+        record["body"] = {"content_type": content_type, "bytes": body_size}
+        if body_size <= MAX_BODY_BYTES:
+            if content_type == "application/json":
+                try:
+                    record["body"]["json"] = body_shape(json.loads(body))
+                except ValueError:
+                    pass
+            elif content_type == "application/x-www-form-urlencoded":
+                record["body"]["form"] = sorted(
+                    {key for key, _ in parse_qsl(body.decode("latin-1"), keep_blank_values=True)}
+                )
+    return record
+
+
+def capture_logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+    """A logger that appends lines to a rotating file from a background thread."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger = logging.getLogger(f"{__name__}.traffic")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(QueueHandler(records))
+    return logger
+
+
+class TrafficCaptureMiddleware:
+    """Write one sanitized JSON line per request for ``replay_traffic.py``.
+
+    A line holds the method, route template, path and query parameters,
+    the body's shape (see ``body_shape``), a pseudonym for the caller,
+    the status and the time until the response finished. Tokens and
+    passwords are never written, and JSON string values are reduced to
+    their length; query parameter values are kept (capped) since filters
+    and search terms drive the cost of reads. Lines are written by a
+    background thread, so the event loop does no file I/O.
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger, sample_rate: float = 1.0):
+        self.app = app
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        started = time.perf_counter()
+        chunks = []
+        body_size = 0
+        status_code = None
+
+        async def recording_receive() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                body_size += len(body)
+                if body_size <= MAX_BODY_BYTES:
+                    chunks.append(body)
+            return message
+
+        async def recording_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, recording_receive, recording_send)
+        finally:
+            record = request_record(scope, b"".join(chunks), body_size)
+            record["at"] = round(started_at, 6)
+            record["status"] = status_code
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self.logger.info(json.dumps(record, separators=(",", ":")))
@@ -0,0 +1,286 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload, undefer
+
+from .invalidation import DASHBOARD, LESSON, cache_bus
+from .models import Lesson, Question, Quiz
+from .question_edits import QuestionDiff, check_diff, diff_questions, invalidate_stats
+from .rendering import ensure_render
+from .schemas import (
+    CatalogImportResult,
+    CatalogLesson,
+    CatalogQuestion,
+    CatalogQuiz,
+    QuestionEdit,
+)
+from .serialization import dumps
+from .suggest import suggestion_index
+from .tags import sync_lesson_tags
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+LESSON_FIELDS = (
+    "title", "description", "content", "level", "duration_minutes", "tags", "is_published"
+)
+
+
+def lesson_record(lesson: Lesson) -> dict:
+    """One NDJSON export line: a lesson with its quizzes and their questions."""
+    return {
+        "id": lesson.id,
+        "external_key": lesson.external_key,
+        "title": lesson.title,
+        "description": lesson.description,
+        "content": lesson.content,
+        "level": lesson.level,
+        "duration_minutes": lesson.duration_minutes,
+        "tags": lesson.tags,
+        "is_published": lesson.is_published,
+        "quizzes": [
+            {
+                "id": quiz.id,
+                "external_key": quiz.external_key,
+                "title": quiz.title,
+                "description": quiz.description,
+                "duration_minutes": quiz.duration_minutes,
+                "questions": [
+                    {
+                        "prompt": question.prompt,
+                        "choices": question.choices,
+                        "correct_answer": question.correct_answer,
+                        "explanation": question.explanation,
+                    }
+                    for question in sorted(quiz.questions, key=lambda q: q.id)
+                ],
+            }
+            for quiz in sorted(lesson.quizzes, key=lambda q: q.id)
+        ],
+    }
+
+
+def export_lessons(
+    session_factory: Callable[[], Session], chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the whole catalog as NDJSON, one chunk of ``chunk_size`` lessons at a time."""
+    db = session_factory()
+    try:
+        last_id = 0
+        while True:
+            lessons = (
+                db.query(Lesson)
+                .options(
+                    undefer(Lesson.content),
+                    selectinload(Lesson.quizzes).selectinload(Quiz.questions),
+                )
+                .filter(Lesson.id > last_id)
+                .order_by(Lesson.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not lessons:
+                break
+            yield b"".join(dumps(lesson_record(lesson)) + b"\n" for lesson in lessons)
+            last_id = lessons[-1].id
+            # Keep memory flat across chunks
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+def position_diff(existing: List[Question], payloads: List[CatalogQuestion]) -> QuestionDiff:
+    """Diff ``payloads`` against ``existing`` questions matched by position."""
+    edits = [
+        QuestionEdit.model_construct(id=question.id, **payload.model_dump())
+        for question, payload in zip(existing, payloads)
+    ]
+    edits += [
+        QuestionEdit.model_construct(**payload.model_dump()) for payload in payloads[len(existing):]
+    ]
+    return diff_questions(existing, edits)
+
+
+def sync_questions(db: Session, quiz: Quiz, payloads: List[CatalogQuestion]) -> None:
+    """Make the quiz's questions match ``payloads`` by position, updating rows in place.
+
+    Item analysis is kept consistent the same way as for
+    ``PUT /quizzes/{quiz_id}/questions``.
+    """
+    existing = sorted(quiz.questions, key=lambda question: question.id)
+    if quiz.id is not None:
+        invalidate_stats(db, quiz.id, position_diff(existing, payloads))
+    for question, payload in zip(existing, payloads):
+        question.prompt = payload.prompt
+        question.choices = payload.choices
+        question.correct_answer = payload.correct_answer
+        question.explanation = payload.explanation
+    for payload in payloads[len(existing):]:
+        quiz.questions.append(Question(**payload.model_dump()))
+    for question in existing[len(payloads):]:
+        db.delete(question)
+
+
+def quiz_index(lesson: Lesson) -> Tuple[Dict[str, Quiz], Dict[str, Quiz]]:
+    """A lesson's quizzes by external_key, and by title for those without one."""
+    by_key, by_title = {}, {}
+    for quiz in lesson.quizzes:
+        if quiz.external_key:
+            by_key[quiz.external_key] = quiz
+        else:
+            by_title[quiz.title] = quiz
+    return by_key, by_title
+
+
+def find_quiz(index: Tuple[Dict[str, Quiz], Dict[str, Quiz]], item: CatalogQuiz) -> Optional[Quiz]:
+    by_key, by_title = index
+    return by_key.get(item.external_key) if item.external_key else by_title.get(item.title)
+
+
+class CatalogImporter:
+    """Upsert NDJSON lesson lines in chunked transactions.
+
+    Lessons with an ``external_key`` update the lesson holding that key.
+    Lessons without one update the keyless lesson whose id is their ``id``,
+    so importing an export again changes nothing; the rest are created.
+    Content is rendered as in ``create_lesson``. Quizzes are matched within
+    their lesson by ``external_key``, or by title when they have none, and
+    their questions by position; a line that would change the existing
+    choices of answered questions is rejected. Every line's source ``id`` is
+    mapped to the id it was stored under. Invalid lines are skipped and
+    reported; database errors abort the import after the chunks that were
+    already committed.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], chunk_size: int = CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.result = CatalogImportResult()
+        self._pending: List[Tuple[int, CatalogLesson]] = []
+        self._line_no = 0
+
+    def feed(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self._line_no += 1
+            if not line.strip():
+                continue
+            try:
+                self._pending.append((self._line_no, CatalogLesson.model_validate_json(line)))
+            except ValidationError as e:
+                error = e.errors(include_url=False)[0]
+                location = ".".join(str(part) for part in error["loc"])
+                detail = f"{location}: {error['msg']}" if location else error["msg"]
+                self._error(self._line_no, detail)
+            if len(self._pending) >= self.chunk_size:
+                self.flush()
+
+    def finish(self) -> CatalogImportResult:
+        self.flush()
+        return self.result
+
+    def _error(self, line_no: int, detail: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append({"line": line_no, "detail": detail})
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        chunk, self._pending = self._pending, []
+        db = self.session_factory()
+        try:
+            self._import_chunk(db, chunk)
+        finally:
+            db.close()
+
+    def _check_questions(self, db: Session, lesson: Lesson, item: CatalogLesson) -> None:
+        """Raise ValueError before anything changes if the line changes answered choices."""
+        index = quiz_index(lesson)
+        for quiz_item in item.quizzes:
+            quiz = find_quiz(index, quiz_item)
+            if quiz is not None and quiz.id is not None:
+                existing = sorted(quiz.questions, key=lambda question: question.id)
+                check_diff(db, quiz.id, position_diff(existing, quiz_item.questions))
+
+    def _import_chunk(self, db: Session, chunk: List[Tuple[int, CatalogLesson]]) -> None:
+        keys = {item.external_key for _, item in chunk if item.external_key}
+        ids = {item.id for _, item in chunk if not item.external_key and item.id is not None}
+        # Lessons by external_key, and keyless lessons by the source id they match
+        by_key: Dict[str, Lesson] = {}
+        by_id: Dict[int, Lesson] = {}
+        if keys or ids:
+            for lesson in (
+                db.query(Lesson)
+                .options(
+                    undefer(Lesson.content),
+                    selectinload(Lesson.quizzes).selectinload(Quiz.questions),
+                    selectinload(Lesson.tag_rows),
+                    selectinload(Lesson.render),
+                )
+                .filter(or_(
+                    Lesson.external_key.in_(keys),
+                    Lesson.id.in_(ids) & Lesson.external_key.is_(None),
+                ))
+            ):
+                if lesson.external_key:
+                    by_key[lesson.external_key] = lesson
+                else:
+                    by_id[lesson.id] = lesson
+
+        stored: List[Tuple[CatalogLesson, Lesson]] = []
+        for line_no, item in chunk:
+            lesson: Optional[Lesson] = (
+                by_key.get(item.external_key) if item.external_key else by_id.get(item.id)
+            )
+            if lesson is None:
+                lesson = Lesson(external_key=item.external_key, quizzes=[])
+                db.add(lesson)
+                if item.external_key:
+                    by_key[item.external_key] = lesson
+                elif item.id is not None:
+                    by_id[item.id] = lesson
+                self.result.lessons_created += 1
+            else:
+                try:
+                    self._check_questions(db, lesson, item)
+                except ValueError as e:
+                    self._error(line_no, str(e))
+                    continue
+                self.result.lessons_updated += 1
+            for field in LESSON_FIELDS:
+                setattr(lesson, field, getattr(item, field))
+            ensure_render(lesson)
+            sync_lesson_tags(lesson)
+
+            index = quiz_index(lesson)
+            for quiz_item in item.quizzes:
+                quiz = find_quiz(index, quiz_item)
+                if quiz is None:
+                    quiz = Quiz(external_key=quiz_item.external_key, questions=[])
+                    lesson.quizzes.append(quiz)
+                    if quiz_item.external_key:
+                        index[0][quiz_item.external_key] = quiz
+                    else:
+                        index[1][quiz_item.title] = quiz
+                    self.result.quizzes_created += 1
+                else:
+                    self.result.quizzes_updated += 1
+                quiz.title = quiz_item.title
+                quiz.description = quiz_item.description
+                quiz.duration_minutes = quiz_item.duration_minutes
+                sync_questions(db, quiz, quiz_item.questions)
+                self.result.questions += len(quiz_item.questions)
+            stored.append((item, lesson))
+
+        db.flush()
+        written = [(lesson.id, item) for item, lesson in stored]
+        for lesson_id, item in written:
+            if item.id is not None:
+                self.result.id_map[item.id] = lesson_id
+        cache_bus.publish(db, LESSON, *(lesson_id for lesson_id, _ in written))
+        # Lesson and quiz titles shown on dashboards may have changed
+        cache_bus.publish(db, DASHBOARD)
+        db.commit()
+        for lesson_id, item in written:
+            suggestion_index.upsert(lesson_id, item.title, item.tags, item.is_published)
@@ -1,4 +1,6 @@
 import os
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -8,8 +10,84 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 60 * 24
     # Use environment variable for database URL, fallback to SQLite for local dev
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./jsacademy.db")
+    # Optional read replica for idempotent GET routes; unset means use the primary
+    database_read_url: Optional[str] = os.getenv("DATABASE_READ_URL")
+    # After a write, the same client reads from the primary for this long
+    read_your_writes_seconds: float = 5.0
+    # Production SQLite profile (WAL, tuned pragmas, single in-process writer)
+    sqlite_tuned: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
     # Allowed origins for CORS
     cors_origins: str = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://localhost:3000")
+    # How long a learner dashboard payload is served from the in-process cache
+    dashboard_cache_ttl_seconds: int = 30
+    # Serialize large list responses straight from rows (see app/serialization.py)
+    fast_json_lists: bool = False
+    # Response compression (see app/compression.py)
+    compression_minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    # How long a precompressed lesson detail response is served from cache
+    lesson_cache_ttl_seconds: int = 60
+    # How long the admin lesson progress distribution report is cached
+    progress_stats_cache_ttl_seconds: int = 60
+    # How often the autocomplete index checks for lesson writes by other processes
+    suggest_refresh_seconds: int = 30
+    # Cross-process cache invalidation (see app/invalidation.py): "auto" uses
+    # LISTEN/NOTIFY on PostgreSQL and table polling elsewhere; "none" is local only
+    cache_bus_backend: str = "auto"
+    # Longest a process serves an entry invalidated by another process
+    cache_bus_poll_seconds: float = 1.0
+    # How long invalidation events are kept
+    cache_bus_retention_seconds: int = 24 * 60 * 60
+    # Token-bucket rate limiting (see app/ratelimit.py): "memory" or "sqlite"
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "./ratelimit.db"
+    # Only enable behind a proxy that sets X-Forwarded-For (e.g. Vercel)
+    rate_limit_trust_forwarded_for: bool = False
+    # Load shedding (see app/loadshed.py): concurrent requests per route class,
+    # kept within the database pool (5 + 10 overflow); classes left out keep
+    # their default
+    load_shedding_enabled: bool = True
+    load_shed_limits: str = "read=8,write=4,auth=2,admin=1"
+    # Requests allowed to queue per class, as a multiple of its limit
+    load_shed_queue_factor: int = 4
+    # Longest a request waits for a slot before it is shed with 503
+    load_shed_max_wait_seconds: float = 0.5
+    # Responses slower than this lower their class's concurrency limit
+    load_shed_target_latency_seconds: float = 1.0
+    # Request profiling (see app/profiling.py): admins can always send
+    # X-Profile: 1; this share of all requests is profiled as well
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5.0
+    profile_dir: str = "./profiles"
+    # Oldest profiles are deleted beyond this many
+    profile_max_files: int = 200
+    # Sanitized request capture for replay_traffic.py (see app/capture.py)
+    traffic_capture_enabled: bool = False
+    traffic_capture_path: str = "./captures/traffic.jsonl"
+    traffic_capture_sample_rate: float = 1.0
+    # The capture file rotates at this size, keeping this many old files
+    traffic_capture_max_bytes: int = 50 * 1024 * 1024
+    traffic_capture_backups: int = 5
+    # How long Idempotency-Key responses are kept and replayed
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    # How long a duplicate waits for the original request in another process
+    idempotency_wait_seconds: float = 10.0
+    # A key whose first request has run this long is assumed abandoned and the
+    # request may run again; keep it well above the slowest POST
+    idempotency_pending_timeout_seconds: int = 10 * 60
+    # Requests with larger bodies (e.g. streamed lesson imports) are passed
+    # through without idempotency rather than buffered
+    idempotency_max_body_bytes: int = 1024 * 1024
+    # Quiz submissions older than this move to the archive (see app/archive.py)
+    submission_archive_after_days: int = 365
+    # Co-enrollment recommendations (see app/recommendations.py)
+    recommendations_top_k: int = 20
+    recommendations_refresh_seconds: int = 60
 
     class Config:
         env_file = ".env"
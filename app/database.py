@@ -1,35 +1,229 @@
+import hashlib
+import hmac
+import math
 import sys
-from sqlalchemy import create_engine
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from .cache import TTLCache
 from .config import settings
 
 
-# Only use check_same_thread for SQLite
-connect_args = {}
-if settings.database_url.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+def connect_args_for(url: str) -> dict:
+    # Only use check_same_thread for SQLite
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {}
+
+
+def configure_sqlite(engine) -> None:
+    """Apply the production SQLite pragmas to every new connection."""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a writer commits; NORMAL only fsyncs at checkpoints
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+class WriterLockTimeout(TimeoutError):
+    """A write transaction waited longer than the busy timeout for the writer lock."""
+
+
+def serialize_writes(session_factory, lock: threading.Lock) -> None:
+    """Funnel every write transaction of ``session_factory`` through ``lock``.
+
+    pysqlite only opens a transaction at the first INSERT/UPDATE/DELETE, so
+    taking the lock right before the first flush or DML statement and
+    releasing it when the transaction ends keeps exactly one writer per
+    process, instead of threads polling each other through busy_timeout.
+    """
+    timeout = settings.sqlite_busy_timeout_ms / 1000
+
+    def acquire(session):
+        if session.info.get("holds_writer_lock"):
+            return
+        if not lock.acquire(timeout=timeout):
+            raise WriterLockTimeout("Timed out waiting for the SQLite writer lock")
+        session.info["holds_writer_lock"] = True
+
+    @event.listens_for(session_factory, "before_flush")
+    def lock_before_flush(session, flush_context, instances):
+        acquire(session)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def lock_before_dml(orm_execute_state):
+        if not orm_execute_state.is_select:
+            acquire(orm_execute_state.session)
+
+    @event.listens_for(session_factory, "after_transaction_end")
+    def release_writer_lock(session, transaction):
+        if transaction.parent is None and session.info.pop("holds_writer_lock", False):
+            lock.release()
+
+
+sqlite_writer_lock = threading.Lock()
 
 try:
     print(f"Creating database engine with URL: {settings.database_url[:20]}...", file=sys.stderr)
     engine = create_engine(
         settings.database_url, 
-        connect_args=connect_args,
+        connect_args=connect_args_for(settings.database_url),
         pool_pre_ping=True  # Verify connections before using
     )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if settings.sqlite_tuned and engine.dialect.name == "sqlite":
+        configure_sqlite(engine)
+        serialize_writes(SessionLocal, sqlite_writer_lock)
     print("✓ Database engine created", file=sys.stderr)
+
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
+    if settings.database_read_url:
+        print("Creating read replica engine...", file=sys.stderr)
+        read_engine = create_engine(
+            settings.database_read_url,
+            connect_args=connect_args_for(settings.database_read_url),
+            pool_pre_ping=True,
+        )
+        ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+        if settings.sqlite_tuned and read_engine.dialect.name == "sqlite":
+            configure_sqlite(read_engine)
+        print("✓ Read replica engine created", file=sys.stderr)
 except Exception as e:
     print(f"❌ Error creating database engine: {e}", file=sys.stderr)
     raise
 
 Base = declarative_base()
 
+# Clients that wrote recently through this process, so their reads stay on the
+# primary (read-your-writes); other processes rely on READ_YOUR_WRITES_COOKIE
+recent_writers = TTLCache(ttl_seconds=settings.read_your_writes_seconds, max_entries=100_000)
+# Signed "read from the primary until" time, sent after a write as a cookie and
+# a header; clients that don't keep cookies echo the header
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+READ_YOUR_WRITES_HEADER = "X-Read-Primary-Until"
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_statement_write(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def client_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return f"auth:{hash(authorization)}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def read_your_writes_token(until: float) -> str:
+    stamp = f"{until:.3f}"
+    signature = hmac.new(settings.secret_key.encode(), stamp.encode(), hashlib.sha256)
+    return f"{stamp}.{signature.hexdigest()[:32]}"
 
-def get_db():
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client wrote within read_your_writes_seconds, in any process."""
+    if recent_writers.get(client_key(request)):
+        return True
+    token = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(
+        READ_YOUR_WRITES_COOKIE
+    )
+    if not token:
+        return False
+    stamp, _, _ = token.rpartition(".")
+    try:
+        until = float(stamp)
+    except ValueError:
+        return False
+    expected = read_your_writes_token(until)
+    return hmac.compare_digest(token.encode(), expected.encode()) and until > time.time()
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        if db.info.get("wrote"):
+            recent_writers.set(client_key(request), True)
+            # Read by ReadYourWritesMiddleware; dependencies exit before the response starts
+            request.state.wrote_to_primary = True
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for idempotent reads: the replica, unless this client just wrote."""
+    if ReadSessionLocal is SessionLocal or wrote_recently(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+class ReadYourWritesMiddleware:
+    """Mark responses to requests that wrote, so the client's next reads skip
+    the replica in whichever process serves them (see ``wrote_recently``)."""
+
+    def __init__(self, app: ASGIApp, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message: Message) -> None:
+            if message["type"] == "http.response.start" and scope.get("state", {}).get(
+                "wrote_to_primary"
+            ):
+                token = read_your_writes_token(time.time() + self.seconds)
+                headers = MutableHeaders(scope=message)
+                headers[READ_YOUR_WRITES_HEADER] = token
+                headers.append(
+                    "set-cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={token}; Max-Age={math.ceil(self.seconds)}; "
+                    "Path=/; HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
+
+
+def iter_partitions(statement, chunk_size: int = 1000):
+    """Stream result rows in chunks from a dedicated session.
+
+    ``yield_per`` keeps at most ``chunk_size`` rows in memory and uses a
+    server-side cursor on backends that support it (PostgreSQL). Reads go to
+    the replica when one is configured.
+    """
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
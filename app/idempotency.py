@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import TTLCache
+from .models import IdempotencyKey
+
+HEADER = "idempotency-key"
+# Responses that say nothing final about the request are not replayed
+UNSTORED_STATUSES = {401, 403, 408, 429}
+PURGE_INTERVAL_SECONDS = 600
+# Response headers not stored: the replay sets them from the stored response
+UNSTORED_HEADERS = {"content-length", "content-type"}
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    headers: List[List[str]]
+
+
+class IdempotencyStore:
+    """Idempotency keys in the database with an in-process cache of completed responses.
+
+    ``claim`` returns one of:
+    ``("new", None)`` - the caller owns the key and must ``complete`` or ``release`` it;
+    ``("done", response)`` - replay the stored response;
+    ``("pending", None)`` - another process is still running the request;
+    ``("mismatch", None)`` - the key was used with a different request body.
+
+    A key still pending after ``pending_timeout_seconds`` is assumed abandoned
+    (its process died) and can be claimed again, so the timeout must be well
+    above the slowest request.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        ttl_seconds: int,
+        pending_timeout_seconds: int = 10 * 60,
+    ):
+        self.session_factory = session_factory
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.pending_timeout = timedelta(seconds=pending_timeout_seconds)
+        self.responses = TTLCache(ttl_seconds=ttl_seconds, max_entries=10_000)
+        self._last_purge = time.monotonic()
+
+    def claim(self, key_hash: str, request_hash: str) -> Tuple[str, Optional[StoredResponse]]:
+        cached = self.responses.get(key_hash)
+        if cached is not None:
+            stored_hash, response = cached
+            return ("done", response) if stored_hash == request_hash else ("mismatch", None)
+
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            record = db.get(IdempotencyKey, key_hash)
+            if record is not None and (
+                record.expires_at < now
+                or (record.status_code is None and record.created_at < now - self.pending_timeout)
+            ):
+                db.delete(record)
+                db.commit()
+                record = None
+            if record is None:
+                db.add(IdempotencyKey(
+                    key_hash=key_hash,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=now + self.ttl,
+                ))
+                try:
+                    db.commit()
+                    return "new", None
+                except IntegrityError:
+                    db.rollback()
+                    record = db.get(IdempotencyKey, key_hash)
+                    if record is None:
+                        return "pending", None
+
+            if record.request_hash != request_hash:
+                return "mismatch", None
+            if record.status_code is None:
+                return "pending", None
+            response = StoredResponse(
+                record.status_code, record.content_type, record.body, record.headers or []
+            )
+            self.responses.set(key_hash, (request_hash, response))
+            return "done", response
+        finally:
+            db.close()
+
+    def complete(self, key_hash: str, request_hash: str, response: StoredResponse) -> None:
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key_hash == key_hash).update({
+                IdempotencyKey.status_code: response.status_code,
+                IdempotencyKey.content_type: response.content_type,
+                IdempotencyKey.headers: response.headers,
+                IdempotencyKey.body: response.body,
+            })
+            db.commit()
+        finally:
+            db.close()
+        self.responses.set(key_hash, (request_hash, response))
+
+    def release(self, key_hash: str) -> None:
+        """Forget a key whose request failed, so a retry runs it again."""
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None)
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        db = self.session_factory()
+        try:
+            deleted = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self.purge_expired()
+
+
+def replay_body(body: bytes, more_body: bool, receive: Receive) -> Receive:
+    """A receive that returns the already read ``body`` first, then reads on from ``receive``."""
+    replayed = False
+
+    async def receive_body() -> Message:
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": more_body}
+
+    return receive_body
+
+
+def _sha256(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Replay the stored response for POSTs repeated with the same Idempotency-Key.
+
+    Keys are scoped to the caller (Authorization header, or client IP when
+    anonymous) and the request path. The first request runs normally and its
+    response is stored unless it is a 5xx or a status in UNSTORED_STATUSES;
+    repeats get that response with ``Idempotent-Replayed: true`` and never
+    reach the route. Concurrent duplicates in this process wait for the first
+    one; duplicates in another process wait up to ``wait_seconds`` for it to
+    finish, then get 409.
+
+    The body has to be read before the route runs, so requests with a body
+    over ``max_body_bytes`` are passed through unprotected instead of being
+    buffered, which keeps streamed uploads streaming.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: IdempotencyStore,
+        wait_seconds: float = 10.0,
+        max_body_bytes: int = 1024 * 1024,
+    ):
+        self.app = app
+        self.store = store
+        self.wait_seconds = wait_seconds
+        self.max_body_bytes = max_body_bytes
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > 255:
+            await JSONResponse({"detail": "Idempotency-Key is too long"}, 400)(scope, receive, send)
+            return
+
+        length = headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body_bytes:
+            await self.app(scope, receive, send)
+            return
+        body = b""
+        more_body = True
+        while more_body and len(body) <= self.max_body_bytes:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        if more_body:
+            await self.app(scope, replay_body(body, more_body, receive), send)
+            return
+
+        client = headers.get("authorization") or (scope.get("client") or ("unknown",))[0]
+        key_hash = _sha256(client.encode(), scope["path"].encode(), key.encode())
+        request_hash = _sha256(body)
+
+        inflight = self._inflight.get(key_hash)
+        if inflight is not None and inflight.get_loop() is asyncio.get_running_loop():
+            # Same event loop: wait for the first request instead of polling
+            await asyncio.shield(inflight)
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            state, stored = await run_in_threadpool(self.store.claim, key_hash, request_hash)
+            if state != "pending" or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.1)
+
+        if state == "done":
+            await self._replay(stored, scope, receive, send)
+            return
+        if state == "mismatch":
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request"}, 422
+            )
+            await response(scope, receive, send)
+            return
+        if state == "pending":
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                409,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key_hash] = future
+        try:
+            await self._run(key_hash, request_hash, scope, replay_body(body, False, receive), send)
+        finally:
+            self._inflight.pop(key_hash, None)
+            future.set_result(None)
+            await run_in_threadpool(self.store.maybe_purge)
+
+    async def _run(
+        self, key_hash: str, request_hash: str, scope: Scope, receive: Receive, send: Send
+    ):
+        status_code = 500
+        content_type = None
+        headers: List[List[str]] = []
+        chunks = []
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                raw = message.get("headers", [])
+                content_type = Headers(raw=raw).get("content-type")
+                headers.extend(
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in raw
+                    if name.decode("latin-1").lower() not in UNSTORED_HEADERS
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await run_in_threadpool(self.store.release, key_hash)
+            raise
+        if status_code >= 500 or status_code in UNSTORED_STATUSES:
+            await run_in_threadpool(self.store.release, key_hash)
+        else:
+            stored = StoredResponse(status_code, content_type, b"".join(chunks), headers)
+            await run_in_threadpool(self.store.complete, key_hash, request_hash, stored)
+
+    async def _replay(self, stored: StoredResponse, scope: Scope, receive: Receive, send: Send):
+        response = Response(
+            stored.body,
+            status_code=stored.status_code,
+            headers={"Idempotent-Replayed": "true"},
+            media_type=stored.content_type,
+        )
+        # Raw pairs, so repeated headers such as Set-Cookie survive
+        response.raw_headers.extend(
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in stored.headers
+        )
+        await response(scope, receive, send)
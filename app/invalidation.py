@@ -0,0 +1,334 @@
+import select as selectors
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .cache import dashboard_cache, invalidate_lesson, lesson_response_cache
+from .config import settings
+from .database import SessionLocal, engine
+from .models import CacheGeneration, CacheInvalidation
+
+DASHBOARD = "dashboard"
+LESSON = "lesson"
+RECOMMENDATIONS = "recommendations"
+CHANNEL = "cache_invalidation"
+# How long an id skipped by a read is re-checked: on PostgreSQL a transaction
+# can commit an event after events with higher ids were already read
+HOLE_SECONDS = 30.0
+MAX_HOLES = 1000
+# How often a process deletes events older than the retention
+PRUNE_INTERVAL_SECONDS = 600
+
+Handler = Callable[[Optional[str]], None]
+
+
+class PollingBackend:
+    """Read new events from the table at most every ``poll_seconds``.
+
+    Works on any database, including SQLite shared by several workers.
+    """
+
+    name = "polling"
+
+    def notify(self, db: Session) -> None:
+        pass
+
+    def notified(self) -> bool:
+        return False
+
+    def listen(self) -> None:
+        pass
+
+
+class PostgresNotifyBackend(PollingBackend):
+    """Polling, plus LISTEN/NOTIFY so events are read as soon as they commit.
+
+    Writers NOTIFY inside their transaction, and PostgreSQL delivers it on
+    commit. The payload is empty, because listeners read the table anyway.
+    A notification lost while the listening connection was down is still
+    picked up by the next poll.
+    """
+
+    name = "postgres"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def notify(self, db: Session) -> None:
+        db.execute(select(func.pg_notify(CHANNEL, "")))
+
+    def listen(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                return
+            try:
+                # A dedicated connection, detached so it doesn't hold a pool slot
+                pooled = self.engine.raw_connection()
+                pooled.detach()
+                connection = pooled.driver_connection
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                self._connection = connection
+            except Exception as e:
+                print(f"Cache invalidation LISTEN failed: {e}", file=sys.stderr)
+
+    def notified(self) -> bool:
+        """Whether a NOTIFY arrived; never blocks."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._connection is None:
+                return False
+            if selectors.select([self._connection], [], [], 0)[0]:
+                self._connection.poll()
+            if self._connection.notifies:
+                self._connection.notifies.clear()
+                return True
+            return False
+        except Exception:
+            # Reconnect on the next sync, which reads the table regardless
+            self._connection = None
+            return True
+        finally:
+            self._lock.release()
+
+
+class InvalidationBus:
+    """Cache invalidations shared by every process using the database.
+
+    ``publish`` adds events to the caller's transaction (the outbox table
+    ``cache_invalidations``), so they exist exactly when the change does;
+    the publishing process applies them right after the commit. Other
+    processes read events newer than the last id they saw in ``sync``,
+    which ``CacheSyncMiddleware`` runs before a request at most every
+    ``poll_seconds`` (or at once on a PostgreSQL NOTIFY). A cache entry is
+    therefore stale for at most about ``poll_seconds`` after the write.
+
+    Missed events fall back to a full reset of every subscribed cache: when
+    the generation counter in ``cache_generation`` changes (``flush_all``),
+    or when this process hasn't synced for longer than events are kept.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        backend: Optional[PollingBackend],
+        poll_seconds: float,
+        retention_seconds: float,
+    ):
+        self.session_factory = session_factory
+        self.backend = backend
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.received = 0
+        self.resets = 0
+        self.errors = 0
+        self._handlers: Dict[str, List[Tuple[Handler, bool]]] = {}
+        self._last_seen: Optional[int] = None
+        self._generation: Optional[int] = None
+        self._holes: Dict[int, float] = {}
+        self._synced_at: Optional[float] = None
+        self._due_at = 0.0
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "InvalidationBus":
+        name = settings.cache_bus_backend
+        if name == "auto":
+            name = "postgres" if engine.dialect.name == "postgresql" else "polling"
+        backend = {
+            "postgres": lambda: PostgresNotifyBackend(engine),
+            "polling": PollingBackend,
+            "none": lambda: None,
+        }[name]()
+        return cls(
+            SessionLocal,
+            backend,
+            settings.cache_bus_poll_seconds,
+            settings.cache_bus_retention_seconds,
+        )
+
+    def subscribe(self, topic: str, handler: Handler, remote_only: bool = False) -> None:
+        """Call ``handler(key)`` for each event on ``topic``; ``key`` is None for the
+        whole topic. ``remote_only`` handlers skip this process's own events."""
+        self._handlers.setdefault(topic, []).append((handler, remote_only))
+
+    def publish(self, db: Session, topic: str, *keys) -> None:
+        """Invalidate ``keys`` of ``topic`` (all of it without keys) once ``db`` commits."""
+        events = [(topic, None if key is None else str(key)) for key in keys or (None,)]
+        if self.backend is not None:
+            db.add_all(CacheInvalidation(topic=topic, key=key) for topic, key in events)
+            self.backend.notify(db)
+        db.info.setdefault("cache_invalidations", []).extend(events)
+
+    def apply(self, events, remote: bool) -> None:
+        for topic, key in events:
+            for handler, remote_only in self._handlers.get(topic, ()):
+                if remote or not remote_only:
+                    handler(key)
+
+    def reset(self) -> None:
+        self.resets += 1
+        self.apply([(topic, None) for topic in self._handlers], remote=True)
+
+    def flush_all(self, db: Session) -> None:
+        """Make every process drop all subscribed cache entries."""
+        bumped = db.execute(
+            update(CacheGeneration)
+            .where(CacheGeneration.id == 1)
+            .values(generation=CacheGeneration.generation + 1)
+        ).rowcount
+        if not bumped:
+            db.add(CacheGeneration(id=1, generation=1))
+            db.flush()
+        # Read inside the transaction, so it is this flush's generation
+        generation = db.scalar(select(CacheGeneration.generation).where(CacheGeneration.id == 1))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return self.flush_all(db)
+        with self._lock:
+            # This process's own sync must not reset the caches a second time
+            self.reset()
+            self._generation = generation
+
+    def due(self) -> bool:
+        if self.backend is None:
+            return False
+        if self.backend.notified():
+            self._due_at = 0.0
+        return time.monotonic() >= self._due_at
+
+    def sync(self) -> None:
+        """Apply events committed by other processes since the last sync."""
+        with self._lock:
+            now = time.monotonic()
+            if self.backend is None or now < self._due_at:
+                return
+            self._due_at = now + self.poll_seconds
+            self.backend.listen()
+            db = self.session_factory()
+            try:
+                self._sync(db, now)
+                self._synced_at = now
+                if now - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                    self._pruned_at = now
+                    self._prune(db)
+            except Exception as e:
+                self.errors += 1
+                print(f"Cache invalidation sync failed: {e}", file=sys.stderr)
+            finally:
+                db.close()
+
+    def _sync(self, db: Session, now: float) -> None:
+        generation = db.scalar(
+            select(CacheGeneration.generation).where(CacheGeneration.id == 1)
+        ) or 0
+        missed = self._synced_at is not None and now - self._synced_at > self.retention_seconds
+        if self._last_seen is None or generation != self._generation or missed:
+            # Nothing is cached before the first sync; otherwise start over
+            if self._last_seen is not None:
+                self.reset()
+            self._last_seen = db.scalar(select(func.max(CacheInvalidation.id))) or 0
+            self._generation = generation
+            self._holes.clear()
+            return
+
+        self._holes = {i: seen for i, seen in self._holes.items() if now - seen < HOLE_SECONDS}
+        condition = CacheInvalidation.id > self._last_seen
+        if self._holes:
+            condition = or_(condition, CacheInvalidation.id.in_(list(self._holes)))
+        rows = db.execute(
+            select(CacheInvalidation.id, CacheInvalidation.topic, CacheInvalidation.key)
+            .where(condition)
+            .order_by(CacheInvalidation.id)
+        ).all()
+        for event_id, _, _ in rows:
+            if event_id > self._last_seen:
+                for missing in range(self._last_seen + 1, event_id):
+                    if len(self._holes) < MAX_HOLES:
+                        self._holes[missing] = now
+                self._last_seen = event_id
+            else:
+                self._holes.pop(event_id, None)
+        self.received += len(rows)
+        self.apply([(topic, key) for _, topic, key in rows], remote=True)
+
+    def _prune(self, db: Session) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        db.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < cutoff))
+        db.commit()
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "poll_seconds": self.poll_seconds,
+            "last_seen": self._last_seen,
+            "generation": self._generation,
+            "received": self.received,
+            "resets": self.resets,
+            "errors": self.errors,
+            "holes": len(self._holes),
+            "seconds_since_sync": (
+                round(time.monotonic() - self._synced_at, 3) if self._synced_at else None
+            ),
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_published(session):
+    events = session.info.pop("cache_invalidations", None)
+    if events:
+        cache_bus.apply(events, remote=False)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_unpublished(session, transaction):
+    # Rolled back, or closed without committing
+    if transaction.parent is None:
+        session.info.pop("cache_invalidations", None)
+
+
+class CacheSyncMiddleware:
+    """Apply other processes' invalidations before handling a request, when due."""
+
+    def __init__(self, app: ASGIApp, bus: InvalidationBus):
+        self.app = app
+        self.bus = bus
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and self.bus.due():
+            await run_in_threadpool(self.bus.sync)
+        await self.app(scope, receive, send)
+
+
+def _invalidate_dashboard(key: Optional[str]) -> None:
+    if key is None:
+        dashboard_cache.clear()
+    else:
+        dashboard_cache.invalidate(int(key))
+
+
+def _invalidate_lesson(key: Optional[str]) -> None:
+    if key is None:
+        lesson_response_cache.clear()
+    else:
+        invalidate_lesson(int(key))
+
+
+cache_bus = InvalidationBus.from_settings()
+cache_bus.subscribe(DASHBOARD, _invalidate_dashboard)
+cache_bus.subscribe(LESSON, _invalidate_lesson)
@@ -0,0 +1,285 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .archive import submission_history
+from .jobs import job
+from .models import Question, QuestionStats, Quiz, QuizItemAnalysis
+from .schemas import ChoiceFrequency, QuestionAnalysis, QuizAnalysis
+
+BATCH_SIZE = 5000
+# Submissions younger than this are left for the next update: on PostgreSQL a
+# transaction can commit a submission after ones with higher ids were read,
+# and the watermark must not pass it (as invalidation.HOLE_SECONDS)
+COMMIT_LAG = timedelta(seconds=30)
+
+# Response matrix codes; choice indices are >= 0
+OTHER = -1  # answered with something that is not one of the choices
+UNANSWERED = -2
+MISSING = -3  # the question did not exist when the submission was made
+NO_CORRECT_CHOICE = -4
+
+# Thresholds behind QuestionAnalysis.flags
+TOO_EASY = 0.9
+TOO_HARD = 0.3
+LOW_DISCRIMINATION = 0.2
+
+
+def correct_indices(questions: List[Question]) -> np.ndarray:
+    return np.array(
+        [
+            question.choices.index(question.correct_answer)
+            if question.correct_answer in question.choices
+            else NO_CORRECT_CHOICE
+            for question in questions
+        ],
+        dtype=np.int16,
+    )
+
+
+def response_matrix(responses: List[dict], questions: List[Question]) -> np.ndarray:
+    """Decode stored responses into a submissions x questions matrix of choice codes.
+
+    Packed rows hold choice indices; rows written before packing hold answer
+    texts, which are looked up in the question's choices.
+    """
+    column = {question.id: j for j, question in enumerate(questions)}
+    choices = [question.choices for question in questions]
+    codes = np.full((len(responses), len(questions)), MISSING, dtype=np.int16)
+    for i, response in enumerate(responses):
+        for question_id, value in response.items():
+            j = column.get(question_id)
+            if j is None:
+                continue
+            if value is None:
+                codes[i, j] = UNANSWERED
+            elif isinstance(value, int):
+                codes[i, j] = value if 0 <= value < len(choices[j]) else OTHER
+            else:
+                codes[i, j] = choices[j].index(value) if value in choices[j] else OTHER
+    return codes
+
+
+def item_sums(codes: np.ndarray, scores: np.ndarray, correct_index: np.ndarray, width: int) -> dict:
+    """Per-question sufficient statistics of one batch, as arrays over questions."""
+    present = (codes != MISSING).astype(np.float64)
+    correct = (codes == correct_index[None, :]).astype(np.float64)
+    answered = codes >= 0
+    flat = (codes + np.arange(codes.shape[1], dtype=np.int64) * width)[answered]
+    choice_counts = np.bincount(flat, minlength=codes.shape[1] * width)
+    return {
+        "attempts": present.sum(axis=0).astype(np.int64),
+        "correct": correct.sum(axis=0).astype(np.int64),
+        "unanswered": (codes == UNANSWERED).sum(axis=0),
+        "other": (codes == OTHER).sum(axis=0),
+        "choice_counts": choice_counts.reshape(codes.shape[1], width),
+        "score_sum": scores @ present,
+        "score_sq_sum": (scores * scores) @ present,
+        "correct_score_sum": scores @ correct,
+    }
+
+
+def _ensure_state(db: Session, quiz: Quiz) -> QuizItemAnalysis:
+    if quiz.item_analysis is None:
+        db.add(QuizItemAnalysis(quiz_id=quiz.id, last_submission_id=0, submissions=0))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request created it first
+            db.rollback()
+        db.refresh(quiz)
+    return quiz.item_analysis
+
+
+def update_item_analysis(db: Session, quiz: Quiz) -> QuizItemAnalysis:
+    """Fold submissions made since the last update into the quiz's QuestionStats.
+
+    Hot and archived submissions are read in id order past the stored
+    watermark, stopping at the first one made less than COMMIT_LAG ago, so a
+    lower id still being committed is not skipped. The watermark is advanced
+    with a conditional UPDATE in the same transaction as the sums, so
+    concurrent updates never count a submission twice: the loser rolls back
+    and keeps the winner's results.
+    """
+    state = _ensure_state(db, quiz)
+    watermark = state.last_submission_id
+    questions = sorted(quiz.questions, key=lambda question: question.id)
+    if not questions:
+        return state
+    correct_index = correct_indices(questions)
+    width = max(len(question.choices) for question in questions) or 1
+
+    history = submission_history()
+    cutoff = datetime.utcnow() - COMMIT_LAG
+    totals: Optional[dict] = None
+    last_id, submissions = watermark, 0
+    while True:
+        rows = db.execute(
+            select(history.c.id, history.c.score, history.c.responses, history.c.submitted_at)
+            .where(history.c.quiz_id == quiz.id, history.c.id > last_id)
+            .order_by(history.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        recent = next((i for i, row in enumerate(rows) if row.submitted_at >= cutoff), None)
+        if recent is not None:
+            rows = rows[:recent]
+        if not rows:
+            break
+        codes = response_matrix([row.responses for row in rows], questions)
+        scores = np.array([row.score for row in rows], dtype=np.float64)
+        sums = item_sums(codes, scores, correct_index, width)
+        totals = sums if totals is None else {key: totals[key] + sums[key] for key in sums}
+        last_id, submissions = rows[-1].id, submissions + len(rows)
+        if recent is not None:
+            break
+
+    if totals is None:
+        return state
+    claimed = db.execute(
+        update(QuizItemAnalysis)
+        .where(
+            QuizItemAnalysis.quiz_id == quiz.id,
+            QuizItemAnalysis.last_submission_id == watermark,
+        )
+        .values(
+            last_submission_id=last_id,
+            submissions=QuizItemAnalysis.submissions + submissions,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    if claimed.rowcount != 1:
+        db.rollback()
+        db.refresh(state)
+        return state
+
+    for j, question in enumerate(questions):
+        stats = question.stats
+        if stats is None:
+            stats = QuestionStats(
+                question_id=question.id,
+                attempts=0,
+                correct=0,
+                unanswered=0,
+                other=0,
+                choice_counts=[],
+                score_sum=0.0,
+                score_sq_sum=0.0,
+                correct_score_sum=0.0,
+            )
+            question.stats = stats
+        counts = list(stats.choice_counts) + [0] * (len(question.choices) - len(stats.choice_counts))
+        for index in range(len(question.choices)):
+            counts[index] += int(totals["choice_counts"][j, index])
+        stats.choice_counts = counts
+        stats.attempts += int(totals["attempts"][j])
+        stats.correct += int(totals["correct"][j])
+        stats.unanswered += int(totals["unanswered"][j])
+        stats.other += int(totals["other"][j])
+        stats.score_sum += float(totals["score_sum"][j])
+        stats.score_sq_sum += float(totals["score_sq_sum"][j])
+        stats.correct_score_sum += float(totals["correct_score_sum"][j])
+    db.commit()
+    db.refresh(state)
+    return state
+
+
+def clear_item_analysis(db: Session, quiz_id: int) -> None:
+    """Delete a quiz's statistics and watermark without committing."""
+    question_ids = select(Question.id).where(Question.quiz_id == quiz_id).scalar_subquery()
+    db.query(QuestionStats).filter(QuestionStats.question_id.in_(question_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(QuizItemAnalysis).filter(QuizItemAnalysis.quiz_id == quiz_id).delete(
+        synchronize_session=False
+    )
+
+
+def reset_item_analysis(db: Session, quiz: Quiz) -> None:
+    """Drop accumulated statistics so the next update rereads every submission."""
+    clear_item_analysis(db, quiz.id)
+    db.commit()
+    db.expire(quiz)
+
+
+def point_biserial(stats: QuestionStats) -> Optional[float]:
+    """Correlation between answering correctly and the submission's total score."""
+    n, n_correct = stats.attempts, stats.correct
+    if n == 0 or n_correct in (0, n):
+        return None
+    mean = stats.score_sum / n
+    variance = stats.score_sq_sum / n - mean * mean
+    if variance <= 1e-12:
+        return None
+    mean_correct = stats.correct_score_sum / n_correct
+    mean_incorrect = (stats.score_sum - stats.correct_score_sum) / (n - n_correct)
+    p = n_correct / n
+    return (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def question_analysis(question: Question) -> QuestionAnalysis:
+    stats = question.stats
+    attempts = stats.attempts if stats else 0
+    counts = list(stats.choice_counts) if stats else []
+    counts += [0] * (len(question.choices) - len(counts))
+    choices = [
+        ChoiceFrequency(
+            choice=choice,
+            count=counts[index],
+            share=round(counts[index] / attempts, 4) if attempts else None,
+            is_correct=choice == question.correct_answer,
+        )
+        for index, choice in enumerate(question.choices)
+    ]
+    if not attempts:
+        return QuestionAnalysis(question_id=question.id, prompt=question.prompt, choices=choices)
+
+    correct_rate = stats.correct / attempts
+    discrimination = point_biserial(stats)
+    correct_count = max((c.count for c in choices if c.is_correct), default=0)
+    flags = []
+    if correct_rate >= TOO_EASY:
+        flags.append("too_easy")
+    if correct_rate <= TOO_HARD:
+        flags.append("too_hard")
+    if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+        flags.append("low_discrimination")
+    if any(c.count > correct_count for c in choices if not c.is_correct):
+        flags.append("misleading")
+    return QuestionAnalysis(
+        question_id=question.id,
+        prompt=question.prompt,
+        attempts=attempts,
+        correct_rate=round(correct_rate, 4),
+        unanswered_rate=round(stats.unanswered / attempts, 4),
+        other_rate=round(stats.other / attempts, 4),
+        discrimination=round(discrimination, 4) if discrimination is not None else None,
+        choices=choices,
+        flags=flags,
+    )
+
+
+def quiz_analysis(db: Session, quiz: Quiz) -> QuizAnalysis:
+    state = update_item_analysis(db, quiz)
+    questions = sorted(quiz.questions, key=lambda question: question.id)
+    return QuizAnalysis(
+        quiz_id=quiz.id,
+        submissions=state.submissions,
+        updated_at=state.updated_at,
+        questions=[question_analysis(question) for question in questions],
+    )
+
+
+@job("quizzes.item_analysis")
+def refresh_item_analyses(db: Session) -> Dict[str, int]:
+    """Bring every quiz's item analysis up to date with its submissions."""
+    updated = 0
+    for quiz in db.query(Quiz).order_by(Quiz.id).all():
+        before = quiz.item_analysis.last_submission_id if quiz.item_analysis else 0
+        if update_item_analysis(db, quiz).last_submission_id != before:
+            updated += 1
+    return {"quizzes_updated": updated}
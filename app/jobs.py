@@ -0,0 +1,206 @@
+import sys
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from .models import Job, JobStatus
+
+# Job kind -> handler(db, **payload); handlers return a JSON-serializable result
+HANDLERS: Dict[str, Callable] = {}
+
+# A running job whose worker has been silent this long is handed to another
+# worker; running jobs renew their lock every HEARTBEAT_INTERVAL
+LOCK_TIMEOUT = timedelta(minutes=2)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+RETRY_BASE_DELAY = timedelta(seconds=5)
+
+
+def job(kind: str):
+    """Register a background job handler under ``kind``."""
+
+    def register(fn: Callable) -> Callable:
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[dict] = None,
+    created_by: Optional[int] = None,
+    max_attempts: int = 3,
+) -> Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    new_job = Job(
+        kind=kind,
+        payload=jsonable_encoder(payload or {}),
+        created_by=created_by,
+        max_attempts=max_attempts,
+    )
+    db.add(new_job)
+    db.commit()
+    db.refresh(new_job)
+    return new_job
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[Job]:
+    """Atomically take the oldest runnable job, or return None.
+
+    The claim is a conditional UPDATE on the row's previous state, so two
+    workers racing for the same job cannot both win on any backend. A job
+    whose worker stopped renewing its lock is taken over, unless it has used
+    all its attempts, in which case it is marked failed.
+    """
+    now = datetime.utcnow()
+    runnable = or_(
+        (Job.status == JobStatus.queued) & (Job.run_after <= now),
+        (Job.status == JobStatus.running) & (Job.locked_at < now - LOCK_TIMEOUT),
+    )
+    for candidate in (
+        db.query(Job.id, Job.status, Job.locked_at, Job.attempts, Job.max_attempts)
+        .filter(runnable)
+        .order_by(Job.run_after, Job.id)
+        .limit(5)
+        .all()
+    ):
+        unchanged = (
+            Job.id == candidate.id,
+            Job.status == candidate.status,
+            Job.locked_at == candidate.locked_at,
+        )
+        if candidate.status == JobStatus.running and candidate.attempts >= candidate.max_attempts:
+            db.execute(
+                update(Job)
+                .where(*unchanged)
+                .values(
+                    status=JobStatus.failed,
+                    error="Worker stopped responding on the last attempt",
+                    locked_by=None,
+                    locked_at=None,
+                    finished_at=now,
+                    updated_at=now,
+                )
+            )
+            db.commit()
+            continue
+        claimed = db.execute(
+            update(Job)
+            .where(*unchanged)
+            .values(
+                status=JobStatus.running,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=Job.attempts + 1,
+                updated_at=now,
+            )
+        )
+        db.commit()
+        if claimed.rowcount == 1:
+            return db.get(Job, candidate.id)
+    return None
+
+
+class Heartbeat:
+    """Renew a claimed job's lock from a background thread while it runs."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        job_id: int,
+        worker_id: str,
+        interval: timedelta = HEARTBEAT_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval.total_seconds()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == self.job_id, Job.locked_by == self.worker_id)
+                    .values(locked_at=datetime.utcnow())
+                )
+                db.commit()
+            except Exception as e:
+                print(f"Job {self.job_id} heartbeat failed: {e}", file=sys.stderr)
+            finally:
+                db.close()
+
+
+def run_job(db: Session, claimed: Job) -> None:
+    job_id, kind, owner = claimed.id, claimed.kind, claimed.locked_by
+    attempts, max_attempts = claimed.attempts, claimed.max_attempts
+    handler = HANDLERS.get(kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result = handler(db, **claimed.payload)
+    except Exception:
+        db.rollback()
+        error = traceback.format_exc(limit=5)
+        if attempts < max_attempts:
+            # Exponential backoff: 5s, 10s, 20s, ...
+            values = {
+                "status": JobStatus.queued,
+                "run_after": datetime.utcnow() + RETRY_BASE_DELAY * 2 ** (attempts - 1),
+            }
+        else:
+            values = {"status": JobStatus.failed, "finished_at": datetime.utcnow()}
+        values["error"] = error
+        print(f"Job {job_id} ({kind}) failed: {error}", file=sys.stderr)
+    else:
+        values = {
+            "status": JobStatus.succeeded,
+            "result": jsonable_encoder(result),
+            "error": None,
+            "finished_at": datetime.utcnow(),
+        }
+    # Only while this worker still holds the lock; a worker that lost it to a
+    # takeover must not overwrite the new owner's state
+    finished = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == owner)
+        .values(**values, locked_by=None, locked_at=None, updated_at=datetime.utcnow())
+    )
+    db.commit()
+    if finished.rowcount != 1:
+        print(f"Job {job_id} ({kind}) lost its lock; outcome discarded", file=sys.stderr)
+
+
+def run_pending(session_factory: Callable[[], Session], worker_id: str, limit: int = 100) -> int:
+    """Run up to ``limit`` runnable jobs in the current thread; return how many ran."""
+    ran = 0
+    while ran < limit:
+        db = session_factory()
+        try:
+            claimed = claim_next(db, worker_id)
+            if claimed is None:
+                break
+            with Heartbeat(session_factory, claimed.id, worker_id):
+                run_job(db, claimed)
+            ran += 1
+        finally:
+            db.close()
+    return ran
@@ -0,0 +1,276 @@
+import asyncio
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+ROUTE_CLASSES = ("read", "write", "auth", "admin")
+# Limits for classes LOAD_SHED_LIMITS leaves out
+DEFAULT_LIMITS = {"read": 8, "write": 4, "auth": 2, "admin": 1}
+# Never shed these paths (load balancer health checks)
+EXEMPT_PATHS = {"/"}
+# Weight of the newest sample in the wait and latency moving averages
+EWMA_WEIGHT = 0.2
+# Shed instead of queueing once the average queue wait reaches this share of
+# the maximum wait: queued requests would mostly time out anyway
+STANDING_QUEUE = 0.8
+# Multiplicative decrease of a class's concurrency limit after a slow response
+LIMIT_BACKOFF = 0.9
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith("/auth"):
+        return "auth"
+    if path.startswith("/admin"):
+        return "admin"
+    if method in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+def parse_limits(value: str) -> Dict[str, int]:
+    """Parse per-class limits from strings like ``"read=8,write=4"``.
+
+    Classes left out keep their DEFAULT_LIMITS; unknown classes and limits
+    that are not positive integers raise ValueError.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for part in value.split(","):
+        name, _, limit = part.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in ROUTE_CLASSES:
+            raise ValueError(
+                f"Unknown route class {name!r} in load shed limits; "
+                f"expected one of {', '.join(ROUTE_CLASSES)}"
+            )
+        try:
+            limits[name] = int(limit)
+        except ValueError:
+            raise ValueError(f"Load shed limit for {name!r} must be an integer, got {limit!r}")
+        if limits[name] < 1:
+            raise ValueError(f"Load shed limit for {name!r} must be at least 1")
+    return limits
+
+
+class _Waiter:
+    __slots__ = ("future", "granted")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """A concurrency limit with a short FIFO wait queue for one route class.
+
+    The limit adapts to latency: every response slower than
+    ``target_latency`` (time to the first response byte) lowers it by
+    LIMIT_BACKOFF, down to 1, and every faster one raises it by ``1/limit``,
+    up to ``max_limit``. A request that finds no free slot waits up to
+    ``max_wait`` seconds, but is shed at once when the queue is full or when
+    recent requests have been waiting close to ``max_wait`` on average
+    (STANDING_QUEUE), since they would most likely time out.
+
+    Thread-safe, and waiters may come from different event loops.
+    """
+
+    def __init__(
+        self, name: str, max_limit: int, max_queue: int, max_wait: float, target_latency: float
+    ):
+        self.name = name
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.target_latency = target_latency
+        self.active = 0
+        self.admitted = 0
+        self.queue_wait = 0.0
+        self.latency = 0.0
+        self.shed: Counter = Counter()
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def count_shed(self, reason: str) -> None:
+        with self._lock:
+            self.shed[reason] += 1
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up."""
+        return max(1, math.ceil(self.latency))
+
+    def _record_wait(self, seconds: float) -> None:
+        self.queue_wait += EWMA_WEIGHT * (seconds - self.queue_wait)
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot. Returns None when admitted, otherwise the shed reason."""
+        with self._lock:
+            if self.active < int(self.limit) and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                self._record_wait(0.0)
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.shed["queue_full"] += 1
+                return "queue_full"
+            if self.queue_wait >= self.max_wait * STANDING_QUEUE:
+                self.shed["queue_wait"] += 1
+                return "queue_wait"
+            waiter = _Waiter(asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # The client went away; give back a slot granted in the meantime
+            with self._lock:
+                if waiter.granted:
+                    self.active -= 1
+                    self._grant()
+                else:
+                    self._waiters.remove(waiter)
+            raise
+        with self._lock:
+            self._record_wait(time.monotonic() - started)
+            if waiter.granted:
+                self.admitted += 1
+                return None
+            self._waiters.remove(waiter)
+            self.shed["timeout"] += 1
+            return "timeout"
+
+    def release(self, latency: Optional[float]) -> None:
+        with self._lock:
+            if latency is not None:
+                self.latency += EWMA_WEIGHT * (latency - self.latency)
+                if latency > self.target_latency:
+                    self.limit = max(1.0, self.limit * LIMIT_BACKOFF)
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.active -= 1
+            self._grant()
+
+    def _grant(self) -> None:
+        # Called with the lock held; the slot passes straight to the next waiter
+        while self._waiters and self.active < int(self.limit):
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.active += 1
+            waiter.future.get_loop().call_soon_threadsafe(_wake, waiter.future)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "max_limit": self.max_limit,
+                "active": self.active,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "queue_wait_seconds": round(self.queue_wait, 4),
+                "latency_seconds": round(self.latency, 4),
+            }
+
+
+class LoadShedder:
+    """One ConcurrencyLimiter per route class."""
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        queue_factor: int,
+        max_wait: float,
+        target_latency: float,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.limiters = {
+            name: ConcurrencyLimiter(
+                name, limits[name], limits[name] * queue_factor, max_wait, target_latency
+            )
+            for name in ROUTE_CLASSES
+        }
+
+    @classmethod
+    def from_settings(cls) -> "LoadShedder":
+        return cls(
+            parse_limits(settings.load_shed_limits),
+            settings.load_shed_queue_factor,
+            settings.load_shed_max_wait_seconds,
+            settings.load_shed_target_latency_seconds,
+            enabled=settings.load_shedding_enabled,
+        )
+
+    def limiter_for(self, method: str, path: str) -> ConcurrencyLimiter:
+        return self.limiters[route_class(method, path)]
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: limiter.snapshot() for name, limiter in self.limiters.items()}
+
+
+def busy_response(retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Server is busy, please retry"},
+        status_code=503,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+class LoadSheddingMiddleware:
+    """Bound in-flight requests per route class and answer the excess with 503.
+
+    Keeping the sum of the class limits at or below the database pool size
+    means requests wait briefly here, in a short queue that sheds early,
+    rather than in SQLAlchemy until ``pool_timeout``.
+    """
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder):
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.shedder.enabled
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.shedder.limiter_for(scope["method"], scope["path"])
+        if await limiter.acquire() is not None:
+            await busy_response(limiter.retry_after())(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        latency = None
+
+        async def timed_send(message: Message) -> None:
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.monotonic() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            limiter.release(latency)
+
+
+load_shedder = LoadShedder.from_settings()
@@ -2,15 +2,22 @@ import sys
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
+from .capture import TrafficCaptureMiddleware, capture_logger
+from .compression import CompressionMiddleware
 from .config import settings
+from .idempotency import IdempotencyMiddleware, IdempotencyStore
+from .invalidation import CacheSyncMiddleware, cache_bus
+from .loadshed import LoadSheddingMiddleware, busy_response, load_shedder
+from .profiling import ProfilingMiddleware, profile_store
 
 print("Importing database...", file=sys.stderr)
-from .database import Base, engine
+from .database import Base, ReadYourWritesMiddleware, SessionLocal, WriterLockTimeout, engine
 print("✓ Database imported", file=sys.stderr)
 
 print("Importing routers...", file=sys.stderr)
-from .routers import admin, auth, enrollments, lessons, quizzes, users
+from .routers import admin, auth, enrollments, jobs, lessons, quizzes, users
 print("✓ Routers imported", file=sys.stderr)
 
 # Don't create tables on every import in serverless environment
@@ -21,6 +28,38 @@ print("Creating FastAPI app...", file=sys.stderr)
 app = FastAPI(title=settings.app_name)
 print("✓ FastAPI app created", file=sys.stderr)
 
+# Innermost, so replayed responses still get CORS headers and compression
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=IdempotencyStore(
+        SessionLocal,
+        settings.idempotency_ttl_seconds,
+        settings.idempotency_pending_timeout_seconds,
+    ),
+    wait_seconds=settings.idempotency_wait_seconds,
+    max_body_bytes=settings.idempotency_max_body_bytes,
+)
+
+# Tell clients that wrote to stay on the primary, whichever process they reach next
+if settings.database_read_url:
+    app.add_middleware(ReadYourWritesMiddleware, seconds=settings.read_your_writes_seconds)
+
+# Evict entries other processes invalidated before any route reads a cache
+app.add_middleware(CacheSyncMiddleware, bus=cache_bus)
+
+# Profiles cover idempotency's own queries, but not time spent queued for a slot
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    session_factory=SessionLocal,
+    sample_rate=settings.profile_sample_rate,
+    interval=settings.profile_interval_ms / 1000,
+)
+
+# Outside idempotency (which claims keys in the database), inside CORS so
+# 503s carry CORS headers
+app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+
 # CORS middleware configuration
 # Parse comma-separated origins from settings
 allowed_origins = [origin.strip() for origin in settings.cors_origins.split(",")]
@@ -32,6 +71,24 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.gzip_level,
+    brotli_quality=settings.brotli_quality,
+)
+
+# Outermost, so captured timings include shed requests and compression
+if settings.traffic_capture_enabled:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        logger=capture_logger(
+            settings.traffic_capture_path,
+            settings.traffic_capture_max_bytes,
+            settings.traffic_capture_backups,
+        ),
+        sample_rate=settings.traffic_capture_sample_rate,
+    )
 
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -39,6 +96,17 @@ app.include_router(lessons.router)
 app.include_router(enrollments.router)
 app.include_router(quizzes.router)
 app.include_router(admin.router)
+app.include_router(jobs.router)
+
+
+# Database pool or SQLite writer lock exhausted: shed instead of a 500.
+# Other timeouts (HTTP clients, asyncio) stay 500s and aren't counted as shed
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(WriterLockTimeout)
+async def database_timeout_handler(request: Request, exc: Exception):
+    limiter = load_shedder.limiter_for(request.method, request.url.path)
+    limiter.count_shed("database_timeout")
+    return busy_response(limiter.retry_after())
 
 
 # Global exception handler to ensure CORS headers are always sent
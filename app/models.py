@@ -1,4 +1,6 @@
 import enum
+import json
+import zlib
 from datetime import datetime
 
 from sqlalchemy import (
@@ -8,17 +10,154 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
+    LargeBinary,
     String,
     Text,
+    TypeDecorator,
     UniqueConstraint,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from .database import Base
 
 
+class CompressedText(TypeDecorator):
+    """Text stored as zlib-compressed UTF-8 bytes.
+
+    The first byte tags the payload: 0x01 zlib, 0x00 raw UTF-8 (used when
+    compression does not pay off). Plain text values written before compression
+    was introduced are returned as-is.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    RAW = b"\x00"
+    ZLIB = b"\x01"
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = value.encode("utf-8")
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return self.ZLIB + packed
+        return self.RAW + raw
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        tag, payload = value[:1], value[1:]
+        if tag == self.ZLIB:
+            return zlib.decompress(payload).decode("utf-8")
+        if tag == self.RAW:
+            return payload.decode("utf-8")
+        return value.decode("utf-8")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class PackedResponses(TypeDecorator):
+    """Quiz answers stored as choice indices, about two bytes per question.
+
+    The Python value maps question id -> index into ``Question.choices``,
+    the answer text itself for an answer that is not one of the choices, and
+    None when the question was left unanswered. On disk: a version byte,
+    then per question (ascending id) the varint id delta and one code byte
+    (0 unanswered, 1 not a choice, 2 + index); code 1 is followed by the
+    varint length and UTF-8 bytes of the text. Version 2 rows stored no text
+    for code 1 and return -1. Rows written before packing was introduced
+    hold a JSON object of answer texts and are returned as {id: text}.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    VERSION = b"\x03"
+    # Earlier layout, where answers that were not a choice lost their text
+    TEXTLESS_VERSION = b"\x02"
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        out = bytearray(self.VERSION)
+        previous = 0
+        for question_id in sorted(value):
+            index = value[question_id]
+            _write_varint(out, question_id - previous)
+            previous = question_id
+            if index is None:
+                out.append(0)
+            elif isinstance(index, str):
+                text = index.encode("utf-8")
+                out.append(1)
+                _write_varint(out, len(text))
+                out.extend(text)
+            elif 0 <= index <= 253:
+                out.append(index + 2)
+            else:
+                raise ValueError("Packed responses support at most 254 choices per question")
+        return bytes(out)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            return {int(key): text for key, text in value.items()}
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        value = bytes(value)
+        version = value[:1]
+        if version not in (self.VERSION, self.TEXTLESS_VERSION):
+            return {int(key): text for key, text in json.loads(value).items()}
+
+        responses = {}
+        pos, question_id = 1, 0
+        while pos < len(value):
+            delta, pos = _read_varint(value, pos)
+            question_id += delta
+            code = value[pos]
+            pos += 1
+            if code == 0:
+                responses[question_id] = None
+            elif code > 1:
+                responses[question_id] = code - 2
+            elif version == self.TEXTLESS_VERSION:
+                responses[question_id] = -1
+            else:
+                length, pos = _read_varint(value, pos)
+                responses[question_id] = value[pos:pos + length].decode("utf-8")
+                pos += length
+        return responses
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
 class UserRole(str, enum.Enum):
     student = "student"
     mentor = "mentor"
@@ -43,15 +182,20 @@ class User(Base):
     submissions = relationship(
         "QuizSubmission", back_populates="user", cascade="all,delete"
     )
+    archived_submissions = relationship("ArchivedQuizSubmission", cascade="all,delete")
+    attempt_summaries = relationship("QuizAttemptSummary", cascade="all,delete")
 
 
 class Lesson(Base):
     __tablename__ = "lessons"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Stable identifier for bulk import/export upserts (see app/catalog.py)
+    external_key = Column(String(255), unique=True, nullable=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
-    content = Column(Text, nullable=False)
+    # Large Markdown body: compressed at rest and only loaded when accessed
+    content = deferred(Column(CompressedText, nullable=False))
     level = Column(String(50), default="beginner", nullable=False)
     duration_minutes = Column(Integer, default=30, nullable=False)
     tags = Column(JSON, nullable=True)
@@ -63,6 +207,45 @@ class Lesson(Base):
 
     quizzes = relationship("Quiz", back_populates="lesson", cascade="all,delete")
     enrollments = relationship("Enrollment", back_populates="lesson", cascade="all,delete")
+    render = relationship(
+        "LessonRender", back_populates="lesson", uselist=False, cascade="all,delete-orphan"
+    )
+    # Normalized copy of ``tags`` for indexed filtering (see app/tags.py)
+    tag_rows = relationship("LessonTag", cascade="all,delete-orphan")
+
+
+class LessonTag(Base):
+    __tablename__ = "lesson_tags"
+    __table_args__ = (Index("ix_lesson_tags_tag_lesson", "tag", "lesson_id"),)
+
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+
+
+# Sanitized HTML and table of contents rendered from Lesson.content on write
+class LessonRender(Base):
+    __tablename__ = "lesson_renders"
+
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    html = deferred(Column(CompressedText, nullable=False))
+    toc = Column(JSON, nullable=False)
+    rendered_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    lesson = relationship("Lesson", back_populates="render")
+
+
+# Top-k co-enrolled lessons per lesson, rebuilt wholesale by app/recommendations.py.
+# Derived data without foreign keys: readers skip lessons that no longer exist.
+class LessonNeighbour(Base):
+    __tablename__ = "lesson_neighbours"
+
+    lesson_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    neighbour_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    co_enrollments = Column(Integer, nullable=False)
+    built_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
 
 class Enrollment(Base):
@@ -81,9 +264,13 @@ class Enrollment(Base):
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        UniqueConstraint("lesson_id", "external_key", name="uq_quiz_lesson_external_key"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    external_key = Column(String(255), nullable=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     duration_minutes = Column(Integer, default=10, nullable=False)
@@ -93,10 +280,15 @@ class Quiz(Base):
     submissions = relationship(
         "QuizSubmission", back_populates="quiz", cascade="all,delete"
     )
+    archived_submissions = relationship("ArchivedQuizSubmission", cascade="all,delete")
+    attempt_summaries = relationship("QuizAttemptSummary", cascade="all,delete")
+    item_analysis = relationship("QuizItemAnalysis", uselist=False, cascade="all,delete")
 
 
 class Question(Base):
     __tablename__ = "questions"
+    # Submissions reference question ids, so a deleted question's id is never reused
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
@@ -106,18 +298,140 @@ class Question(Base):
     explanation = Column(Text, nullable=True)
 
     quiz = relationship("Quiz", back_populates="questions")
+    stats = relationship("QuestionStats", uselist=False, cascade="all,delete")
+
+
+# Item analysis watermark: submissions up to last_submission_id are folded
+# into QuestionStats (see app/item_analysis.py)
+class QuizItemAnalysis(Base):
+    __tablename__ = "quiz_item_analyses"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    last_submission_id = Column(Integer, default=0, nullable=False)
+    submissions = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Running sums per question, enough to derive difficulty, distractor
+# frequencies and point-biserial discrimination without rereading submissions
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    unanswered = Column(Integer, default=0, nullable=False)
+    # Answers that matched none of the choices
+    other = Column(Integer, default=0, nullable=False)
+    choice_counts = Column(JSON, nullable=False)
+    score_sum = Column(Float, default=0.0, nullable=False)
+    score_sq_sum = Column(Float, default=0.0, nullable=False)
+    correct_score_sum = Column(Float, default=0.0, nullable=False)
 
 
 class QuizSubmission(Base):
     __tablename__ = "quiz_submissions"
+    # Never reuse the id of a row that was deleted (moved to the archive)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     score = Column(Float, nullable=False)
-    submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    responses = Column(JSON, nullable=False)
+    submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    responses = Column(PackedResponses, nullable=False)
 
     quiz = relationship("Quiz", back_populates="submissions")
     user = relationship("User", back_populates="submissions")
 
+
+# Submissions moved out of the hot table by app/archive.py; on PostgreSQL the
+# table is range-partitioned by month, with partitions created on demand
+class ArchivedQuizSubmission(Base):
+    __tablename__ = "quiz_submissions_archive"
+    __table_args__ = (
+        Index("ix_quiz_submissions_archive_user_quiz", "user_id", "quiz_id"),
+        {"postgresql_partition_by": "RANGE (submitted_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # Part of the key because PostgreSQL requires it on partitioned tables
+    submitted_at = Column(DateTime, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    score = Column(Float, nullable=False)
+    responses = Column(PackedResponses, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Per user and quiz totals of the archived attempts, so hot paths such as the
+# dashboard never have to read the archive
+class QuizAttemptSummary(Base):
+    __tablename__ = "quiz_attempt_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    best_score = Column(Float, nullable=False)
+    last_submitted_at = Column(DateTime, nullable=False)
+
+
+# Responses of POSTs sent with an Idempotency-Key (see app/idempotency.py)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the caller, path and key
+    key_hash = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    # Other response headers as [name, value] pairs, e.g. Location
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.queued, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    locked_by = Column(String(255), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    finished_at = Column(DateTime, nullable=True)
+
+
+# Cache invalidation events, written in the same transaction as the change
+# they describe and read by every process (see app/invalidation.py)
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    # Ids must never be reused: processes read events newer than the last id seen
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(50), nullable=False)
+    # NULL invalidates the whole topic
+    key = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+# Single row; bumping it makes every process drop all of its cached entries
+class CacheGeneration(Base):
+    __tablename__ = "cache_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,287 @@
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .models import User, UserRole
+
+HEADER = "x-profile"
+RESPONSE_HEADER = "X-Profile-Id"
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+# Longest SQL statement text kept per query
+MAX_STATEMENT_LENGTH = 2000
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{code.co_qualname} ({module}:{code.co_firstlineno})".replace(";", ":")
+
+
+def worker_context(frame) -> Optional[contextvars.Context]:
+    """The context of the task a threadpool worker is running, or None when idle.
+
+    Starlette's ``run_in_threadpool`` hands sync endpoints and dependencies
+    to anyio worker threads, which call ``context.run(func, *args)`` with a
+    copy of the request's context; between tasks they wait on a queue or
+    report the result to the event loop.
+    """
+    callee = None
+    while frame is not None:
+        if frame.f_globals.get("__name__", "").startswith("anyio."):
+            context = frame.f_locals.get("context")
+            if isinstance(context, contextvars.Context):
+                module = callee.f_globals.get("__name__", "") if callee is not None else ""
+                return None if module.startswith(("queue", "asyncio")) or not module else context
+        callee, frame = frame, frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Stack samples and SQL timings collected for one request.
+
+    Sync routes and dependencies run in threadpool workers, where a cProfile
+    started by the middleware would not see them. Instead a sampler thread
+    reads ``sys._current_frames()`` every ``interval`` seconds from the
+    moment the middleware starts the profile. It records the event loop
+    thread while it is running this request's middleware frame (async
+    routes, middleware, response rendering), and any worker whose current
+    task runs in a context carrying this profile (see ``worker_context``).
+    """
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.queries: List[dict] = []
+        self._loop_thread: Optional[int] = None
+        self._anchor = None
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self) -> None:
+        """Start sampling; call it from the frame that runs the request on the event loop."""
+        self._loop_thread = threading.get_ident()
+        self._anchor = sys._getframe(1)
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+
+    def _running_request(self, thread_id: int, frame) -> bool:
+        if thread_id == self._loop_thread:
+            # The loop also runs other requests; only count this one's frames
+            while frame is not None:
+                if frame is self._anchor:
+                    return True
+                frame = frame.f_back
+            return False
+        context = worker_context(frame)
+        return context is not None and context.get(current_profile) is self
+
+    def _sample(self) -> None:
+        sampler = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler or not self._running_request(thread_id, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame)
+                    frame = frame.f_back
+                self.stacks[";".join(frame_label(frame) for frame in reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks ("root;...;leaf count"), as read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, status_code: Optional[int]) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(self.duration, 6),
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "sql_seconds": round(sum(query["seconds"] for query in self.queries), 6),
+            "sql": self.queries,
+        }
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and conn.info.get("profile_query_started"):
+        elapsed = time.perf_counter() - conn.info["profile_query_started"].pop()
+        profile.queries.append({
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "seconds": round(elapsed, 6),
+            "executemany": executemany,
+        })
+
+
+class ProfileStore:
+    """Saved profiles as ``<id>.json`` (summary and SQL) and ``<id>.folded``
+    (stacks) in one directory, pruned to the newest ``max_files``."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not PROFILE_ID.match(profile_id):
+            raise ValueError("Invalid profile id")
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def save(self, profile: RequestProfile, status_code: Optional[int]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile.id, ".folded"), "w") as out:
+            out.write(profile.folded())
+        with open(self._path(profile.id, ".json"), "w") as out:
+            json.dump(profile.summary(status_code), out)
+        self._prune()
+
+    def _prune(self) -> None:
+        summaries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in summaries[: max(0, len(summaries) - self.max_files)]:
+            profile_id = entry.name[: -len(".json")]
+            for suffix in (".json", ".folded"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except (FileNotFoundError, ValueError):
+                    pass
+
+    def list(self) -> List[dict]:
+        """Saved profiles, newest first, without their SQL."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                with open(entry.path) as source:
+                    summary = json.load(source)
+                summary.pop("sql", None)
+                profiles.append(summary)
+        return sorted(profiles, key=lambda summary: summary["started_at"], reverse=True)
+
+    def read(self, profile_id: str, suffix: str) -> Optional[str]:
+        try:
+            with open(self._path(profile_id, suffix)) as source:
+                return source.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+class ProfilingMiddleware:
+    """Profile requests sent by an admin with ``X-Profile: 1``, plus a random
+    ``sample_rate`` share of all requests.
+
+    Profiled responses carry ``X-Profile-Id``; the profile is saved after
+    the response is sent and can be downloaded from ``/admin/profiles``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        session_factory: Callable[[], Session],
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+    ):
+        self.app = app
+        self.store = store
+        self.session_factory = session_factory
+        self.sample_rate = sample_rate
+        self.interval = interval
+
+    def _is_admin(self, user_id: int) -> bool:
+        db = self.session_factory()
+        try:
+            return db.query(User.id).filter(
+                User.id == user_id, User.role == UserRole.admin
+            ).first() is not None
+        finally:
+            db.close()
+
+    async def _requested_by_admin(self, headers: Headers) -> bool:
+        if headers.get(HEADER) != "1":
+            return False
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            user_id = int(jwt.decode(token, settings.secret_key, algorithms=["HS256"])["sub"])
+        except (JWTError, KeyError, ValueError):
+            return False
+        return await run_in_threadpool(self._is_admin, user_id)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and not await self._requested_by_admin(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], self.interval)
+        status_code = None
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)[RESPONSE_HEADER] = profile.id
+            await send(message)
+
+        token = current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_profile.reset(token)
+            profile.stop()
+            await run_in_threadpool(self.store.save, profile, status_code)
+
+
+profile_store = ProfileStore(settings.profile_dir, settings.profile_max_files)
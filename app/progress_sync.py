@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Enrollment, Lesson
+from .schemas import ProgressEvent
+
+
+def _utc(moment: datetime) -> datetime:
+    """Naive UTC, as stored in enrollments.last_accessed."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def merge_events(events: Iterable[ProgressEvent]) -> Dict[int, Tuple[float, datetime]]:
+    """Collapse events to one (max progress, latest timestamp) per lesson.
+
+    Client clocks are not trusted to be in the past: timestamps are capped
+    at the server's current time.
+    """
+    now = datetime.utcnow()
+    merged: Dict[int, Tuple[float, datetime]] = {}
+    for event in events:
+        moment = min(_utc(event.client_timestamp), now)
+        if event.lesson_id in merged:
+            progress, latest = merged[event.lesson_id]
+            merged[event.lesson_id] = (max(progress, event.progress_percent), max(latest, moment))
+        else:
+            merged[event.lesson_id] = (event.progress_percent, moment)
+    return merged
+
+
+def sync_progress(db: Session, user_id: int, events: List[ProgressEvent]) -> List[Enrollment]:
+    """Apply a batch of offline progress events with one upsert and commit.
+
+    Progress only moves forward and ``last_accessed`` only moves later, so
+    a retried batch, or batches synced out of order, cannot undo newer
+    progress. Lessons the learner is not enrolled in are enrolled; events for
+    lessons that no longer exist are dropped. Returns all of the user's
+    enrollments, most recently accessed first.
+    """
+    merged = merge_events(events)
+    if merged:
+        lesson_ids = set(db.scalars(select(Lesson.id).where(Lesson.id.in_(list(merged)))))
+        rows = [
+            {
+                "user_id": user_id,
+                "lesson_id": lesson_id,
+                "progress_percent": progress,
+                "last_accessed": latest,
+            }
+            for lesson_id, (progress, latest) in merged.items()
+            if lesson_id in lesson_ids
+        ]
+        if rows:
+            dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+            table = Enrollment.__table__
+            statement = dialect.insert(table).values(rows)
+            excluded = statement.excluded
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.lesson_id],
+                set_={
+                    "progress_percent": case(
+                        (excluded.progress_percent > table.c.progress_percent,
+                         excluded.progress_percent),
+                        else_=table.c.progress_percent,
+                    ),
+                    "last_accessed": case(
+                        (excluded.last_accessed > table.c.last_accessed, excluded.last_accessed),
+                        else_=table.c.last_accessed,
+                    ),
+                },
+            ))
+            db.commit()
+
+    return (
+        db.query(Enrollment)
+        .filter(Enrollment.user_id == user_id)
+        .order_by(Enrollment.last_accessed.desc())
+        .all()
+    )
@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from .archive import submission_history
+from .item_analysis import clear_item_analysis
+from .models import Question, QuestionStats
+from .schemas import QuestionBase
+
+QUESTION_FIELDS = ("prompt", "choices", "correct_answer", "explanation")
+
+
+@dataclass
+class QuestionDiff:
+    inserts: List[dict] = field(default_factory=list)
+    # Rows keyed by "id"; only questions with a changed field
+    updates: List[dict] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+    unchanged: List[dict] = field(default_factory=list)
+    # Updated questions whose existing choices were removed, moved or reworded
+    choices_changed: List[int] = field(default_factory=list)
+    # Updated questions whose correct choice index changed
+    regraded: List[int] = field(default_factory=list)
+
+
+def _correct_index(choices: List[str], correct_answer: str) -> Optional[int]:
+    return choices.index(correct_answer) if correct_answer in choices else None
+
+
+def changes_choices(old: List[str], new: List[str]) -> bool:
+    """True unless ``new`` is ``old`` with choices appended.
+
+    Packed submissions store choice indices, so only appending keeps recorded
+    answers meaningful; removing, moving or rewording a choice would silently
+    change what they mean.
+    """
+    return new[: len(old)] != old
+
+
+def diff_questions(existing: Sequence[Question], edits: Sequence[QuestionBase]) -> QuestionDiff:
+    """Compare the desired questions with the stored ones by question id.
+
+    Edits without an ``id`` are new questions; stored questions missing from
+    ``edits`` are deleted.
+    """
+    by_id = {question.id: question for question in existing}
+    diff = QuestionDiff()
+    seen = set()
+    for edit in edits:
+        values = {name: getattr(edit, name) for name in QUESTION_FIELDS}
+        question_id = getattr(edit, "id", None)
+        if question_id is None:
+            diff.inserts.append(values)
+            continue
+        question = by_id.get(question_id)
+        if question is None:
+            raise ValueError(f"Question {question_id} does not belong to this quiz")
+        if question_id in seen:
+            raise ValueError(f"Question {question_id} is listed more than once")
+        seen.add(question_id)
+
+        if all(getattr(question, name) == values[name] for name in QUESTION_FIELDS):
+            diff.unchanged.append({"id": question_id, **values})
+            continue
+        diff.updates.append({"id": question_id, **values})
+        if changes_choices(question.choices, values["choices"]):
+            diff.choices_changed.append(question_id)
+        if _correct_index(question.choices, question.correct_answer) != _correct_index(
+            values["choices"], values["correct_answer"]
+        ):
+            diff.regraded.append(question_id)
+    diff.deletes = [question.id for question in existing if question.id not in seen]
+    return diff
+
+
+def has_submissions(db: Session, quiz_id: int) -> bool:
+    history = submission_history()
+    return (
+        db.execute(select(history.c.id).where(history.c.quiz_id == quiz_id).limit(1)).first()
+        is not None
+    )
+
+
+def check_diff(db: Session, quiz_id: int, diff: QuestionDiff) -> None:
+    """Reject choice edits that would change what recorded answers mean."""
+    if diff.choices_changed and has_submissions(db, quiz_id):
+        ids = ", ".join(str(question_id) for question_id in diff.choices_changed)
+        raise ValueError(
+            f"Choices of answered questions ({ids}) can only be appended, "
+            "not removed, reordered or reworded; add a new question instead"
+        )
+
+
+def invalidate_stats(db: Session, quiz_id: int, diff: QuestionDiff) -> None:
+    """Keep item analysis consistent with the edit, in the current transaction.
+
+    A changed correct choice invalidates the quiz's running sums, which are
+    then rebuilt from every submission on the next analysis.
+    """
+    if diff.regraded:
+        clear_item_analysis(db, quiz_id)
+    elif diff.deletes:
+        db.query(QuestionStats).filter(QuestionStats.question_id.in_(diff.deletes)).delete(
+            synchronize_session=False
+        )
+
+
+def apply_question_edits(
+    db: Session, quiz_id: int, existing: Sequence[Question], edits: Sequence[QuestionBase]
+) -> List[dict]:
+    """Diff ``edits`` against ``existing`` and write it with one bulk statement per kind.
+
+    Does not commit. Returns the quiz's questions after the edit, in id
+    order, built from the diff rather than reloaded.
+    """
+    diff = diff_questions(existing, edits)
+    check_diff(db, quiz_id, diff)
+    invalidate_stats(db, quiz_id, diff)
+
+    if diff.deletes:
+        db.query(Question).filter(Question.id.in_(diff.deletes)).delete(synchronize_session=False)
+    if diff.updates:
+        db.execute(update(Question), diff.updates)
+    inserted = []
+    if diff.inserts:
+        rows = [{"quiz_id": quiz_id, **values} for values in diff.inserts]
+        ids = db.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+        ).all()
+        inserted = [{"id": question_id, **values} for question_id, values in zip(ids, diff.inserts)]
+    return sorted(diff.unchanged + diff.updates + inserted, key=lambda row: row["id"])
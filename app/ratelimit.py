@@ -0,0 +1,172 @@
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from .config import settings
+from .dependencies import get_current_active_user
+from .models import User
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Rate:
+    """A token bucket shape parsed from strings like ``"10/minute"``."""
+
+    def __init__(self, count: int, period_seconds: float):
+        self.capacity = float(count)
+        self.refill_per_second = count / period_seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        count, _, period = value.partition("/")
+        return cls(int(count), PERIODS[period.strip()])
+
+
+def take_token(
+    tokens: float, updated_at: float, now: float, rate: Rate, cost: float = 1.0
+) -> Tuple[float, float]:
+    """Refill a bucket up to ``now`` and take ``cost`` tokens.
+
+    Returns the new token count and the seconds to wait before retrying
+    (0 when the request is allowed).
+    """
+    tokens = min(rate.capacity, tokens + (now - updated_at) * rate.refill_per_second)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate.refill_per_second
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def consume(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens from the bucket at ``key``; return Retry-After seconds."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process buckets; suitable for a single worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            # Re-inserting keeps the dict in least-recently-used order
+            tokens, updated_at = self._buckets.pop(key, (rate.capacity, now))
+            tokens, retry_after = take_token(tokens, updated_at, now, rate, cost)
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = (tokens, now)
+        return retry_after
+
+
+class SQLiteBackend(RateLimitBackend):
+    """Buckets shared by every process that points at the same SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # Buckets are soft state: trade durability on power loss for speed
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (rate.capacity, now)
+            tokens, retry_after = take_token(tokens, updated_at, now, rate, cost)
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        if settings.rate_limit_backend == "sqlite":
+            _backend = SQLiteBackend(settings.rate_limit_sqlite_path)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+def set_backend(backend: RateLimitBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def check_limit(key: str, rate: Rate) -> None:
+    retry_after = get_backend().consume(key, rate)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def rate_limit(name: str, per_ip: Optional[str] = None, per_user: Optional[str] = None):
+    """Build a route dependency enforcing per-IP and/or per-user token buckets.
+
+    Usage: ``@router.post(..., dependencies=[Depends(rate_limit("x", per_ip="5/minute"))])``
+    """
+    ip_rate = Rate.parse(per_ip) if per_ip else None
+    user_rate = Rate.parse(per_user) if per_user else None
+
+    def check_ip(request: Request) -> None:
+        if ip_rate is not None and settings.rate_limit_enabled:
+            check_limit(f"{name}:ip:{client_ip(request)}", ip_rate)
+
+    if user_rate is None:
+        return check_ip
+
+    def check_ip_and_user(
+        request: Request, current_user: User = Depends(get_current_active_user)
+    ) -> None:
+        check_ip(request)
+        if settings.rate_limit_enabled:
+            check_limit(f"{name}:user:{current_user.id}", user_rate)
+
+    return check_ip_and_user
@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .analytics import fetch_columns
+from .config import settings
+from .invalidation import RECOMMENDATIONS, cache_bus
+from .jobs import job
+from .models import Enrollment, Lesson, LessonNeighbour
+from .schemas import RecommendedLesson
+
+# Upper bound on (lesson, lesson) pairs materialized at once while counting
+PAIR_CHUNK = 4_000_000
+
+# (neighbour lesson id, score, co-enrollments), best first
+Neighbour = Tuple[int, float, int]
+
+
+def co_enrollment_counts(
+    user_ids: np.ndarray, lesson_index: np.ndarray, n_lessons: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse lesson x lesson co-occurrence counts from (user, lesson) pairs.
+
+    ``lesson_index`` holds dense lesson indices in ``[0, n_lessons)``. Returns
+    flat keys ``i * n_lessons + j`` (i != j) and their counts. Every learner
+    contributes one count to each ordered pair of their lessons; pairs are
+    generated per user with repeat/arange arithmetic, in bounded chunks.
+    """
+    order = np.argsort(user_ids, kind="stable")
+    users, lessons = user_ids[order], lesson_index[order]
+    if len(users) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    sizes = np.diff(np.r_[starts, len(users)])
+    # For each enrollment: where its learner's lessons start and how many there are
+    group_start = np.repeat(starts, sizes)
+    group_size = np.repeat(sizes, sizes)
+
+    pair_ends = np.cumsum(group_size)
+    keys, counts = [], []
+    begin = 0
+    while begin < len(lessons):
+        done = pair_ends[begin - 1] if begin else 0
+        end = max(begin + 1, int(np.searchsorted(pair_ends, done + PAIR_CHUNK, side="right")))
+        chunk_sizes = group_size[begin:end]
+        left = np.repeat(lessons[begin:end], chunk_sizes)
+        offsets = np.arange(len(left)) - np.repeat(np.cumsum(chunk_sizes) - chunk_sizes, chunk_sizes)
+        right = lessons[np.repeat(group_start[begin:end], chunk_sizes) + offsets]
+        pairs = left * n_lessons + right
+        chunk_keys, chunk_counts = np.unique(pairs[left != right], return_counts=True)
+        keys.append(chunk_keys)
+        counts.append(chunk_counts)
+        begin = end
+
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(counts)).astype(np.int64)
+    return keys, counts
+
+
+def top_neighbours(
+    user_ids: np.ndarray, lesson_ids: np.ndarray, top_k: int
+) -> List[Tuple[int, int, int, float, int]]:
+    """Rank each lesson's co-enrolled lessons by cosine similarity.
+
+    The score ``c_ij / sqrt(n_i * n_j)`` keeps very popular lessons from being
+    everybody's neighbour. Returns ``(lesson_id, rank, neighbour_id, score,
+    co_enrollments)`` rows with rank < ``top_k``.
+    """
+    lessons, lesson_index = np.unique(lesson_ids, return_inverse=True)
+    n = len(lessons)
+    keys, counts = co_enrollment_counts(user_ids, lesson_index, n)
+    if len(keys) == 0:
+        return []
+    enrolled = np.bincount(lesson_index, minlength=n)
+    rows, cols = keys // n, keys % n
+    scores = counts / np.sqrt(enrolled[rows] * enrolled[cols])
+
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores, counts = rows[order], cols[order], scores[order], counts[order]
+    first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ranks = np.arange(len(rows)) - np.repeat(first, np.diff(np.r_[first, len(rows)]))
+    keep = ranks < top_k
+    return list(zip(
+        lessons[rows[keep]].tolist(),
+        ranks[keep].tolist(),
+        lessons[cols[keep]].tolist(),
+        scores[keep].tolist(),
+        counts[keep].tolist(),
+    ))
+
+
+def load_enrollments(db: Session) -> Tuple[np.ndarray, np.ndarray]:
+    rows = fetch_columns(db, select(Enrollment.user_id, Enrollment.lesson_id), dtype=np.int64)
+    return rows[:, 0], rows[:, 1]
+
+
+@job("recommendations.build")
+def build_recommendations(db: Session, top_k: Optional[int] = None):
+    """Recompute lesson_neighbours from the enrollments table in one transaction."""
+    top_k = top_k or settings.recommendations_top_k
+    started = time.perf_counter()
+    user_ids, lesson_ids = load_enrollments(db)
+    rows = top_neighbours(user_ids, lesson_ids, top_k)
+    built_at = datetime.utcnow()
+
+    db.execute(delete(LessonNeighbour))
+    if rows:
+        db.execute(insert(LessonNeighbour), [
+            {
+                "lesson_id": lesson_id,
+                "rank": rank,
+                "neighbour_id": neighbour_id,
+                "score": score,
+                "co_enrollments": co_enrollments,
+                "built_at": built_at,
+            }
+            for lesson_id, rank, neighbour_id, score, co_enrollments in rows
+        ])
+    cache_bus.publish(db, RECOMMENDATIONS)
+    db.commit()
+    return {
+        "enrollments": len(user_ids),
+        "neighbours": len(rows),
+        "built_at": built_at,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class NeighbourIndex:
+    """In-memory copy of lesson_neighbours, reloaded when a newer build lands.
+
+    The build timestamp is checked at most every ``refresh_seconds``, so
+    processes other than the one that ran the build pick it up shortly after.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._neighbours: Dict[int, List[Neighbour]] = {}
+        self._built_at: Optional[datetime] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = None
+
+    def _refresh(self, db: Session) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+        built_at = db.query(func.max(LessonNeighbour.built_at)).scalar()
+        if built_at == self._built_at:
+            return
+        neighbours = defaultdict(list)
+        for lesson_id, neighbour_id, score, co_enrollments in db.query(
+            LessonNeighbour.lesson_id,
+            LessonNeighbour.neighbour_id,
+            LessonNeighbour.score,
+            LessonNeighbour.co_enrollments,
+        ).order_by(LessonNeighbour.lesson_id, LessonNeighbour.rank):
+            neighbours[lesson_id].append((neighbour_id, score, co_enrollments))
+        with self._lock:
+            self._neighbours = dict(neighbours)
+            self._built_at = built_at
+
+    def related(self, db: Session, lesson_id: int) -> List[Neighbour]:
+        self._refresh(db)
+        return self._neighbours.get(lesson_id, [])
+
+    def recommend(self, db: Session, lesson_ids: List[int], limit: int) -> List[Neighbour]:
+        """Sum neighbour scores over the given lessons, excluding those lessons."""
+        self._refresh(db)
+        taken = set(lesson_ids)
+        scores: Dict[int, float] = defaultdict(float)
+        co_enrollments: Dict[int, int] = defaultdict(int)
+        for lesson_id in taken:
+            for neighbour_id, score, count in self._neighbours.get(lesson_id, []):
+                if neighbour_id not in taken:
+                    scores[neighbour_id] += score
+                    co_enrollments[neighbour_id] += count
+        best = sorted(scores, key=lambda lesson_id: (-scores[lesson_id], lesson_id))[:limit]
+        return [(lesson_id, scores[lesson_id], co_enrollments[lesson_id]) for lesson_id in best]
+
+
+neighbour_index = NeighbourIndex(settings.recommendations_refresh_seconds)
+cache_bus.subscribe(RECOMMENDATIONS, lambda key: neighbour_index.invalidate())
+
+
+def recommended_lessons(db: Session, neighbours: List[Neighbour]) -> List[RecommendedLesson]:
+    """Attach lesson summaries to neighbours, dropping unpublished or deleted lessons."""
+    lessons = {
+        row.id: row
+        for row in db.query(
+            Lesson.id, Lesson.title, Lesson.description, Lesson.level, Lesson.duration_minutes
+        ).filter(Lesson.id.in_([lesson_id for lesson_id, _, _ in neighbours]), Lesson.is_published)
+    }
+    return [
+        RecommendedLesson(
+            **lessons[lesson_id]._asdict(), score=round(score, 4), co_enrollments=co_enrollments
+        )
+        for lesson_id, score, co_enrollments in neighbours
+        if lesson_id in lessons
+    ]
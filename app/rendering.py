@@ -0,0 +1,64 @@
+import hashlib
+from datetime import datetime
+from typing import List, Tuple
+
+import markdown
+import nh3
+
+from .models import Lesson, LessonRender
+
+# Bump to re-render every lesson after changing extensions or sanitizer rules
+RENDERER_VERSION = "1"
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "toc"]
+
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "code": {"class"},
+    "img": {"src", "alt", "title"},
+    "th": {"align"},
+    "td": {"align"},
+    **{f"h{level}": {"id"} for level in range(1, 7)},
+}
+
+
+def content_hash(content: str) -> str:
+    digest = hashlib.sha256(RENDERER_VERSION.encode("utf-8"))
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _flatten_toc(tokens: list, toc: List[dict]) -> List[dict]:
+    for token in tokens:
+        toc.append({"level": token["level"], "id": token["id"], "title": token["name"]})
+        _flatten_toc(token["children"], toc)
+    return toc
+
+
+def render_markdown(content: str) -> Tuple[str, List[dict]]:
+    """Render lesson Markdown to sanitized HTML and a flat heading table of contents."""
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    html = nh3.clean(
+        md.convert(content),
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes={"http", "https", "mailto"},
+    )
+    return html, _flatten_toc(md.toc_tokens, [])
+
+
+def ensure_render(lesson: Lesson) -> LessonRender:
+    """Render the lesson body unless the stored artifact matches its content hash."""
+    digest = content_hash(lesson.content)
+    render = lesson.render
+    if render is not None and render.content_hash == digest:
+        return render
+
+    html, toc = render_markdown(lesson.content)
+    if render is None:
+        render = LessonRender()
+        lesson.render = render
+    render.content_hash = digest
+    render.html = html
+    render.toc = toc
+    render.rendered_at = datetime.utcnow()
+    return render
@@ -1,4 +1,4 @@
-from . import auth, enrollments, lessons, quizzes, users
+from . import admin, auth, enrollments, jobs, lessons, quizzes, users
 
-__all__ = ["auth", "enrollments", "lessons", "quizzes", "users"]
+__all__ = ["admin", "auth", "enrollments", "jobs", "lessons", "quizzes", "users"]
 
@@ -1,12 +1,21 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..analytics import lesson_progress_stats
+from ..archive import total_attempts
+from ..cache import progress_stats_cache
+from ..database import get_db, get_read_db
 from ..dependencies import get_current_active_user
+from ..invalidation import cache_bus
+from ..jobs import enqueue, job
+from ..loadshed import load_shedder
 from ..models import Enrollment, Lesson, Quiz, User, UserRole
+from ..profiling import profile_store
+from ..schemas import JobRead, LessonProgressStats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,29 +25,84 @@ def ensure_admin(user: User):
         raise HTTPException(status_code=403, detail="Admin role required")
 
 
-@router.get("/stats")
-def get_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    ensure_admin(current_user)
-    
+@job("admin.stats")
+def compute_stats(db: Session):
     total_users = db.query(User).count()
     total_lessons = db.query(Lesson).count()
     total_quizzes = db.query(Quiz).count()
     total_enrollments = db.query(Enrollment).count()
+    total_submissions = total_attempts(db)
     
     return {
         "total_users": total_users,
         "total_lessons": total_lessons,
         "total_quizzes": total_quizzes,
-        "total_enrollments": total_enrollments
+        "total_enrollments": total_enrollments,
+        "total_submissions": total_submissions
     }
 
 
+@router.get("/stats")
+def get_stats(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    ensure_admin(current_user)
+    return compute_stats(db)
+
+
+@router.get("/load")
+def get_load(current_user: User = Depends(get_current_active_user)):
+    ensure_admin(current_user)
+    return load_shedder.snapshot()
+
+
+@router.get("/caches")
+def get_cache_bus(current_user: User = Depends(get_current_active_user)):
+    ensure_admin(current_user)
+    return cache_bus.snapshot()
+
+
+@router.post("/caches/flush")
+def flush_caches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    ensure_admin(current_user)
+    cache_bus.flush_all(db)
+    return cache_bus.snapshot()
+
+
+@router.get("/profiles")
+def list_profiles(current_user: User = Depends(get_current_active_user)):
+    ensure_admin(current_user)
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, current_user: User = Depends(get_current_active_user)):
+    ensure_admin(current_user)
+    summary = profile_store.read(profile_id, ".json")
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(summary, media_type="application/json")
+
+
+@router.get("/profiles/{profile_id}/flamegraph", response_class=PlainTextResponse)
+def download_flamegraph(profile_id: str, current_user: User = Depends(get_current_active_user)):
+    ensure_admin(current_user)
+    stacks = profile_store.read(profile_id, ".folded")
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+    )
+
+
 @router.get("/users")
 def list_all_users(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=50, le=100)
@@ -66,7 +130,7 @@ def list_all_users(
 @router.get("/users/{user_id}/progress")
 def get_user_progress(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     ensure_admin(current_user)
@@ -101,13 +165,8 @@ def get_user_progress(
     }
 
 
-@router.get("/lessons/stats")
-def get_lessons_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    ensure_admin(current_user)
-    
+@job("admin.lessons_stats")
+def compute_lessons_stats(db: Session):
     lessons = db.query(Lesson).all()
     
     result = []
@@ -130,3 +189,63 @@ def get_lessons_stats(
         })
     
     return result
+
+
+@router.get("/lessons/stats")
+def get_lessons_stats(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    ensure_admin(current_user)
+    return compute_lessons_stats(db)
+
+
+@job("admin.lessons_progress")
+def compute_lessons_progress(db: Session):
+    stats = progress_stats_cache.get("lessons")
+    if stats is None:
+        stats = lesson_progress_stats(db)
+        progress_stats_cache.set("lessons", stats)
+    return stats
+
+
+@router.get("/lessons/progress", response_model=list[LessonProgressStats])
+def get_lessons_progress(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    ensure_admin(current_user)
+    return compute_lessons_progress(db)
+
+
+REPORT_JOBS = {
+    "stats": "admin.stats",
+    "lessons-stats": "admin.lessons_stats",
+    "lessons-progress": "admin.lessons_progress",
+    "recommendations": "recommendations.build",
+    "item-analysis": "quizzes.item_analysis",
+}
+
+
+@router.post("/reports/{report}", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+def queue_report(
+    report: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    ensure_admin(current_user)
+    if report not in REPORT_JOBS:
+        raise HTTPException(status_code=404, detail="Unknown report")
+    return enqueue(db, REPORT_JOBS[report], created_by=current_user.id)
+
+
+@router.post("/archive/submissions", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+def queue_submission_archive(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    older_than_days: Optional[int] = Query(default=None, ge=1)
+):
+    ensure_admin(current_user)
+    return enqueue(
+        db, "submissions.archive", {"older_than_days": older_than_days}, created_by=current_user.id
+    )
@@ -4,13 +4,18 @@ from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import User
+from ..ratelimit import rate_limit
 from ..schemas import Token
 from ..security import create_access_token, verify_password
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/token", response_model=Token)
+@router.post(
+    "/token",
+    response_model=Token,
+    dependencies=[Depends(rate_limit("auth.token", per_ip="10/minute"))],
+)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == form_data.username).first()
     if not user or not verify_password(form_data.password, user.hashed_password):
@@ -5,11 +5,14 @@ from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..dependencies import get_current_active_user
+from ..invalidation import DASHBOARD, cache_bus
 from ..models import Enrollment, Lesson, User
+from ..progress_sync import sync_progress
 from ..schemas import (
     EnrollmentCreate,
     EnrollmentProgressUpdate,
     EnrollmentRead,
+    ProgressSync,
 )
 
 router = APIRouter(prefix="/enrollments", tags=["enrollments"])
@@ -41,6 +44,7 @@ def enroll(
         lesson_id=payload.lesson_id,
     )
     db.add(enrollment)
+    cache_bus.publish(db, DASHBOARD, current_user.id)
     db.commit()
     db.refresh(enrollment)
     return enrollment
@@ -59,6 +63,17 @@ def my_enrollments(
     )
 
 
+@router.post("/me/sync", response_model=list[EnrollmentRead])
+def sync_my_progress(
+    payload: ProgressSync,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    # Committed with the upsert; dropped if no event names a known lesson
+    cache_bus.publish(db, DASHBOARD, current_user.id)
+    return sync_progress(db, current_user.id, payload.events)
+
+
 @router.patch("/{enrollment_id}", response_model=EnrollmentRead)
 def update_progress(
     enrollment_id: int,
@@ -79,6 +94,7 @@ def update_progress(
     enrollment.progress_percent = payload.progress_percent
     enrollment.last_accessed = datetime.utcnow()
     db.add(enrollment)
+    cache_bus.publish(db, DASHBOARD, current_user.id)
     db.commit()
     db.refresh(enrollment)
     return enrollment
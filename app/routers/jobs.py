@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..dependencies import get_current_active_user
+from ..models import Job, User, UserRole
+from ..schemas import JobRead
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def read_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    found = db.query(Job).filter(Job.id == job_id).first()
+    if not found:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if found.created_by != current_user.id and current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return found
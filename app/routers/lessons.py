@@ -1,12 +1,35 @@
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, undefer
+from starlette.concurrency import run_in_threadpool
 
-from ..database import get_db
+from ..cache import lesson_response_cache
+from ..catalog import CatalogImporter, export_lessons
+from ..compression import PrecompressedResponse, precompress
+from ..config import settings
+from ..database import ReadSessionLocal, SessionLocal, get_db, get_read_db
 from ..dependencies import get_current_active_user
-from ..models import Lesson, User, UserRole
-from ..schemas import LessonCreate, LessonRead, LessonUpdate
+from ..invalidation import DASHBOARD, LESSON, cache_bus
+from ..jobs import enqueue, job
+from ..models import Lesson, LessonRender, User, UserRole
+from ..recommendations import neighbour_index, recommended_lessons
+from ..rendering import ensure_render
+from ..schemas import (
+    CatalogImportResult,
+    JobRead,
+    LessonCreate,
+    LessonHTMLRead,
+    LessonRead,
+    LessonUpdate,
+    RecommendedLesson,
+    Suggestions,
+    TagFacet,
+)
+from ..serialization import FastJSONResponse, NDJSONResponse, rows_to_dicts, schema_columns
+from ..suggest import suggestion_index
+from ..tags import filter_by_tags, parse_tag_list, sync_lesson_tags, tag_facets
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
@@ -16,12 +39,59 @@ def ensure_editor(user: User):
         raise HTTPException(status_code=403, detail="Mentor or admin role required")
 
 
-@router.get("", response_model=list[LessonRead])
-def list_lessons(
-    db: Session = Depends(get_db),
-    search: Optional[str] = Query(default=None),
-    level: Optional[str] = Query(default=None),
-    published_only: bool = Query(default=True),
+def render_lesson_html(db: Session, lesson_id: int) -> bytes:
+    lesson = (
+        db.query(Lesson)
+        .options(
+            undefer(Lesson.content),
+            joinedload(Lesson.render).undefer(LessonRender.html),
+        )
+        .filter(Lesson.id == lesson_id)
+        .first()
+    )
+    if not lesson:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    # No-op unless the lesson predates render-on-write or RENDERER_VERSION changed
+    render = ensure_render(lesson)
+    body = LessonHTMLRead(
+        id=lesson.id,
+        title=lesson.title,
+        description=lesson.description,
+        level=lesson.level,
+        duration_minutes=lesson.duration_minutes,
+        tags=lesson.tags,
+        is_published=lesson.is_published,
+        created_at=lesson.created_at,
+        updated_at=lesson.updated_at,
+        content_hash=render.content_hash,
+        html=render.html,
+        toc=render.toc,
+    ).model_dump_json().encode("utf-8")
+    if db.new or db.dirty:
+        # db may be bound to a read replica: persist the fresh render on the primary
+        with SessionLocal() as primary:
+            stored = primary.get(LessonRender, lesson_id) or LessonRender(lesson_id=lesson_id)
+            stored.content_hash = render.content_hash
+            stored.html = render.html
+            stored.toc = render.toc
+            stored.rendered_at = render.rendered_at
+            primary.add(stored)
+            try:
+                primary.commit()
+            except IntegrityError:
+                # A concurrent first render stored it already; it's only a cache
+                primary.rollback()
+    return body
+
+
+def filtered_lessons(
+    db: Session,
+    search: Optional[str],
+    level: Optional[str],
+    published_only: bool,
+    tag: Optional[str],
+    tags_all: Optional[str],
+    tags_any: Optional[str],
 ):
     query = db.query(Lesson)
     if search:
@@ -30,15 +100,112 @@ def list_lessons(
         query = query.filter(Lesson.level == level)
     if published_only:
         query = query.filter(Lesson.is_published.is_(True))
-    return query.order_by(Lesson.created_at.desc()).all()
+    required = parse_tag_list(tags_all) + parse_tag_list(tag)
+    return filter_by_tags(query, sorted(set(required)), parse_tag_list(tags_any))
 
 
-@router.get("/{lesson_id}", response_model=LessonRead)
-def get_lesson(lesson_id: int, db: Session = Depends(get_db)):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+@router.get("", response_model=list[LessonRead])
+def list_lessons(
+    db: Session = Depends(get_read_db),
+    search: Optional[str] = Query(default=None),
+    level: Optional[str] = Query(default=None),
+    published_only: bool = Query(default=True),
+    tag: Optional[str] = Query(default=None),
+    tags_all: Optional[str] = Query(default=None, description="Comma-separated; all must match"),
+    tags_any: Optional[str] = Query(default=None, description="Comma-separated; any may match"),
+):
+    query = filtered_lessons(db, search, level, published_only, tag, tags_all, tags_any)
+    query = query.order_by(Lesson.created_at.desc())
+    if settings.fast_json_lists:
+        columns = schema_columns(Lesson, LessonRead)
+        return FastJSONResponse(rows_to_dicts(query.with_entities(*columns).all(), columns))
+    return query.options(undefer(Lesson.content)).all()
+
+
+@router.get("/tags", response_model=list[TagFacet])
+def list_tag_facets(
+    db: Session = Depends(get_read_db),
+    search: Optional[str] = Query(default=None),
+    level: Optional[str] = Query(default=None),
+    published_only: bool = Query(default=True),
+    tag: Optional[str] = Query(default=None),
+    tags_all: Optional[str] = Query(default=None),
+    tags_any: Optional[str] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    query = filtered_lessons(db, search, level, published_only, tag, tags_all, tags_any)
+    return tag_facets(db, query, limit)
+
+
+@router.get("/suggest", response_model=Suggestions)
+def suggest_lessons(
+    db: Session = Depends(get_read_db),
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=8, ge=1, le=20),
+):
+    return FastJSONResponse(suggestion_index.suggest(db, q, limit))
+
+
+@router.get("/export", response_class=NDJSONResponse)
+def export_catalog(current_user: User = Depends(get_current_active_user)):
+    ensure_editor(current_user)
+    return NDJSONResponse(
+        export_lessons(ReadSessionLocal),
+        headers={"Content-Disposition": 'attachment; filename="lessons.ndjson"'},
+    )
+
+
+@router.post("/import", response_model=CatalogImportResult)
+async def import_catalog(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+):
+    ensure_editor(current_user)
+    importer = CatalogImporter(SessionLocal)
+    pending = b""
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        if lines:
+            await run_in_threadpool(importer.feed, lines)
+    await run_in_threadpool(importer.feed, [pending])
+    return await run_in_threadpool(importer.finish)
+
+
+@router.get("/{lesson_id}", response_model=Union[LessonRead, LessonHTMLRead])
+def get_lesson(
+    lesson_id: int,
+    db: Session = Depends(get_read_db),
+    fmt: str = Query(default="markdown", alias="format", pattern="^(markdown|html)$"),
+):
+    variants = lesson_response_cache.get((lesson_id, fmt))
+    if variants is None:
+        if fmt == "html":
+            body = render_lesson_html(db, lesson_id)
+        else:
+            lesson = (
+                db.query(Lesson)
+                .options(undefer(Lesson.content))
+                .filter(Lesson.id == lesson_id)
+                .first()
+            )
+            if not lesson:
+                raise HTTPException(status_code=404, detail="Lesson not found")
+            body = LessonRead.model_validate(lesson).model_dump_json().encode("utf-8")
+        variants = precompress(body)
+        lesson_response_cache.set((lesson_id, fmt), variants)
+    return PrecompressedResponse(variants)
+
+
+@router.get("/{lesson_id}/related", response_model=list[RecommendedLesson])
+def get_related_lessons(
+    lesson_id: int,
+    db: Session = Depends(get_read_db),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    if not db.query(Lesson.id).filter(Lesson.id == lesson_id).first():
         raise HTTPException(status_code=404, detail="Lesson not found")
-    return lesson
+    return recommended_lessons(db, neighbour_index.related(db, lesson_id)[:limit])
 
 
 @router.post("", response_model=LessonRead, status_code=status.HTTP_201_CREATED)
@@ -49,9 +216,14 @@ def create_lesson(
 ):
     ensure_editor(current_user)
     lesson = Lesson(**payload.model_dump())
+    ensure_render(lesson)
+    sync_lesson_tags(lesson)
     db.add(lesson)
+    db.flush()
+    cache_bus.publish(db, LESSON, lesson.id)
     db.commit()
     db.refresh(lesson)
+    suggestion_index.upsert(lesson.id, lesson.title, lesson.tags, lesson.is_published)
     return lesson
 
 
@@ -67,26 +239,57 @@ def update_lesson(
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
 
-    for key, value in payload.model_dump(exclude_unset=True).items():
+    update_data = payload.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(lesson, key, value)
+    if "content" in update_data:
+        ensure_render(lesson)
+    if "tags" in update_data:
+        sync_lesson_tags(lesson)
 
     db.add(lesson)
+    cache_bus.publish(db, LESSON, lesson_id)
+    # Dashboards of every enrolled learner show the lesson's summary
+    cache_bus.publish(db, DASHBOARD)
     db.commit()
     db.refresh(lesson)
+    suggestion_index.upsert(lesson.id, lesson.title, lesson.tags, lesson.is_published)
     return lesson
 
 
-@router.delete("/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
+@job("lessons.delete")
+def delete_lesson_cascade(db: Session, lesson_id: int):
+    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    if lesson:
+        db.delete(lesson)
+    cache_bus.publish(db, LESSON, lesson_id)
+    cache_bus.publish(db, DASHBOARD)
+    db.commit()
+    suggestion_index.remove(lesson_id)
+    return {"lesson_id": lesson_id, "deleted": lesson is not None}
+
+
+@router.delete(
+    "/{lesson_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={202: {"model": JobRead, "description": "Deletion queued (background=true)"}},
+)
 def delete_lesson(
     lesson_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    background: bool = Query(default=False),
 ):
     ensure_editor(current_user)
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    db.delete(lesson)
-    db.commit()
+    if background:
+        queued = enqueue(db, "lessons.delete", {"lesson_id": lesson_id}, created_by=current_user.id)
+        return FastJSONResponse(
+            JobRead.model_validate(queued).model_dump(mode="json"),
+            status_code=status.HTTP_202_ACCEPTED,
+        )
+    delete_lesson_cascade(db, lesson_id)
     return None
 
@@ -1,10 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..config import settings
+from ..database import ReadSessionLocal, get_db, get_read_db, iter_partitions
 from ..dependencies import get_current_active_user
+from ..invalidation import DASHBOARD, cache_bus
+from ..item_analysis import quiz_analysis, reset_item_analysis
 from ..models import Lesson, Question, Quiz, QuizSubmission, User, UserRole
-from ..schemas import QuizCreate, QuizRead, QuizSubmissionCreate, QuizSubmissionRead, QuizUpdate
+from ..question_edits import apply_question_edits
+from ..ratelimit import rate_limit
+from ..schemas import (
+    QuestionRead,
+    QuizAnalysis,
+    QuizCreate,
+    QuizQuestionsUpdate,
+    QuizRead,
+    QuizSubmissionCreate,
+    QuizSubmissionRead,
+    QuizUpdate,
+)
+from ..serialization import FastJSONResponse, NDJSONResponse, dumps, rows_to_dicts, schema_columns
+from ..submissions import grade, submission_read
 
 router = APIRouter(prefix="/quizzes", tags=["quizzes"])
 
@@ -34,40 +51,122 @@ def create_quiz(
     db.add(quiz)
     db.flush()
 
-    for question in payload.questions:
-        db.add(
-            Question(
-                quiz_id=quiz.id,
-                prompt=question.prompt,
-                choices=question.choices,
-                correct_answer=question.correct_answer,
-                explanation=question.explanation,
-            )
-        )
-
+    questions = apply_question_edits(db, quiz.id, [], payload.questions)
+    response = quiz_read(quiz, questions)
+    # Dashboards list every quiz of the enrolled lessons
+    cache_bus.publish(db, DASHBOARD)
     db.commit()
-    db.refresh(quiz)
-    return quiz
+    return response
+
+
+def quiz_read(quiz: Quiz, questions: list[dict]) -> QuizRead:
+    return QuizRead(
+        id=quiz.id,
+        lesson_id=quiz.lesson_id,
+        title=quiz.title,
+        description=quiz.description,
+        duration_minutes=quiz.duration_minutes,
+        questions=questions,
+    )
+
+
+def fast_quiz_list(db: Session, query) -> FastJSONResponse:
+    quiz_columns = schema_columns(Quiz, QuizRead, exclude=("questions",))
+    quizzes = rows_to_dicts(query.with_entities(*quiz_columns).all(), quiz_columns)
+    by_id = {}
+    for quiz in quizzes:
+        quiz["questions"] = []
+        by_id[quiz["id"]] = quiz
+
+    if by_id:
+        question_columns = schema_columns(Question, QuestionRead)
+        rows = (
+            db.query(Question.quiz_id, *question_columns)
+            .filter(Question.quiz_id.in_(query.with_entities(Quiz.id).scalar_subquery()))
+            .order_by(Question.id)
+            .all()
+        )
+        keys = [column.key for column in question_columns]
+        for quiz_id, *values in rows:
+            by_id[quiz_id]["questions"].append(dict(zip(keys, values)))
+    return FastJSONResponse(quizzes)
 
 
 @router.get("", response_model=list[QuizRead])
-def list_all_quizzes(db: Session = Depends(get_db)):
-    return db.query(Quiz).all()
+def list_all_quizzes(
+    db: Session = Depends(get_read_db),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=100),
+):
+    query = db.query(Quiz).order_by(Quiz.id).offset(skip).limit(limit)
+    if settings.fast_json_lists:
+        return fast_quiz_list(db, query)
+    return query.all()
+
+
+def quiz_ndjson_chunks():
+    quiz_columns = schema_columns(Quiz, QuizRead, exclude=("questions",))
+    question_columns = schema_columns(Question, QuestionRead)
+    quiz_keys = [column.key for column in quiz_columns]
+    question_keys = [column.key for column in question_columns]
+    statement = select(*quiz_columns).order_by(Quiz.id)
+
+    db = ReadSessionLocal()
+    try:
+        for rows in iter_partitions(statement):
+            quizzes = [dict(zip(quiz_keys, row)) for row in rows]
+            questions = {quiz["id"]: [] for quiz in quizzes}
+            for quiz_id, *values in db.execute(
+                select(Question.quiz_id, *question_columns)
+                .where(Question.quiz_id.in_(list(questions)))
+                .order_by(Question.id)
+            ):
+                questions[quiz_id].append(dict(zip(question_keys, values)))
+            for quiz in quizzes:
+                quiz["questions"] = questions[quiz["id"]]
+            yield b"".join(dumps(quiz) + b"\n" for quiz in quizzes)
+    finally:
+        db.close()
+
+
+@router.get("/stream", response_class=NDJSONResponse)
+def stream_quizzes(current_user: User = Depends(get_current_active_user)):
+    ensure_editor(current_user)
+    return NDJSONResponse(quiz_ndjson_chunks())
 
 
 @router.get("/lesson/{lesson_id}", response_model=list[QuizRead])
-def quizzes_for_lesson(lesson_id: int, db: Session = Depends(get_db)):
-    return db.query(Quiz).filter(Quiz.lesson_id == lesson_id).all()
+def quizzes_for_lesson(lesson_id: int, db: Session = Depends(get_read_db)):
+    query = db.query(Quiz).filter(Quiz.lesson_id == lesson_id)
+    if settings.fast_json_lists:
+        return fast_quiz_list(db, query)
+    return query.all()
 
 
 @router.get("/{quiz_id}", response_model=QuizRead)
-def read_quiz(quiz_id: int, db: Session = Depends(get_db)):
+def read_quiz(quiz_id: int, db: Session = Depends(get_read_db)):
     quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     return quiz
 
 
+@router.get("/{quiz_id}/analysis", response_model=QuizAnalysis)
+def read_quiz_analysis(
+    quiz_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    rebuild: bool = Query(default=False),
+):
+    ensure_editor(current_user)
+    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if rebuild:
+        reset_item_analysis(db, quiz)
+    return quiz_analysis(db, quiz)
+
+
 @router.patch("/{quiz_id}", response_model=QuizRead)
 def update_quiz(
     quiz_id: int,
@@ -84,12 +183,42 @@ def update_quiz(
         setattr(quiz, field, value)
 
     db.add(quiz)
+    # Dashboards show quiz titles
+    cache_bus.publish(db, DASHBOARD)
     db.commit()
     db.refresh(quiz)
     return quiz
 
 
-@router.post("/{quiz_id}/submit", response_model=QuizSubmissionRead)
+@router.put("/{quiz_id}/questions", response_model=QuizRead)
+def replace_questions(
+    quiz_id: int,
+    payload: QuizQuestionsUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    ensure_editor(current_user)
+    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    try:
+        questions = apply_question_edits(db, quiz.id, quiz.questions, payload.questions)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    response = quiz_read(quiz, questions)
+    db.commit()
+    return response
+
+
+@router.post(
+    "/{quiz_id}/submit",
+    response_model=QuizSubmissionRead,
+    dependencies=[
+        Depends(rate_limit("quizzes.submit", per_ip="60/minute", per_user="20/minute"))
+    ],
+)
 def submit_quiz(
     quiz_id: int,
     payload: QuizSubmissionCreate,
@@ -104,15 +233,7 @@ def submit_quiz(
     if total == 0:
         raise HTTPException(status_code=400, detail="Quiz has no questions")
 
-    correct = 0
-    responses = {}
-    for question in quiz.questions:
-        answer = payload.answers.get(question.id)
-        responses[question.id] = answer
-        if answer and answer == question.correct_answer:
-            correct += 1
-
-    score = (correct / total) * 100
+    score, responses = grade(quiz.questions, payload.answers)
     submission = QuizSubmission(
         quiz_id=quiz.id,
         user_id=current_user.id,
@@ -120,7 +241,8 @@ def submit_quiz(
         responses=responses,
     )
     db.add(submission)
+    cache_bus.publish(db, DASHBOARD, current_user.id)
     db.commit()
     db.refresh(submission)
-    return submission
+    return submission_read(submission, quiz.questions)
 
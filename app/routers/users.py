@@ -1,16 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..cache import dashboard_cache
+from ..config import settings
+from ..database import get_db, get_read_db, iter_partitions
 from ..dependencies import get_current_active_user
-from ..models import User, UserRole
-from ..schemas import UserCreate, UserRead, UserUpdate
+from ..invalidation import DASHBOARD, cache_bus
+from ..models import Enrollment, Lesson, Quiz, QuizAttemptSummary, QuizSubmission, User, UserRole
+from ..ratelimit import rate_limit
+from ..recommendations import neighbour_index, recommended_lessons
+from ..schemas import (
+    DashboardEnrollment,
+    DashboardLesson,
+    DashboardQuizScore,
+    DashboardRead,
+    RecommendedLesson,
+    UserCreate,
+    UserRead,
+    UserUpdate,
+)
+from ..serialization import (
+    FastJSONResponse,
+    NDJSONResponse,
+    ndjson_chunks,
+    rows_to_dicts,
+    schema_columns,
+)
 from ..security import get_password_hash
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.post("", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=UserRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("users.create", per_ip="5/minute"))],
+)
 def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
@@ -30,8 +57,25 @@ def create_user(payload: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=list[UserRead])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(User).all()
+def list_users(
+    db: Session = Depends(get_read_db),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=100),
+):
+    query = db.query(User).order_by(User.id).offset(skip).limit(limit)
+    if settings.fast_json_lists:
+        columns = schema_columns(User, UserRead)
+        return FastJSONResponse(rows_to_dicts(query.with_entities(*columns).all(), columns))
+    return query.all()
+
+
+@router.get("/stream", response_class=NDJSONResponse)
+def stream_users(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Admin role required")
+    columns = schema_columns(User, UserRead)
+    statement = select(*columns).order_by(User.id)
+    return NDJSONResponse(ndjson_chunks(iter_partitions(statement), columns))
 
 
 @router.get("/me", response_model=UserRead)
@@ -39,8 +83,137 @@ def read_current_user(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
+def build_dashboard(db: Session, user: User) -> DashboardRead:
+    # Query 1: enrollments with lesson summaries (lesson content is never loaded)
+    enrollment_rows = (
+        db.query(
+            Enrollment.id,
+            Enrollment.progress_percent,
+            Enrollment.last_accessed,
+            Lesson.id,
+            Lesson.title,
+            Lesson.description,
+            Lesson.level,
+            Lesson.duration_minutes,
+        )
+        .join(Lesson, Lesson.id == Enrollment.lesson_id)
+        .filter(Enrollment.user_id == user.id)
+        .order_by(Enrollment.last_accessed.desc())
+        .all()
+    )
+
+    # Query 2: every quiz of the enrolled lessons with this user's best score
+    quizzes_by_lesson = {}
+    lesson_ids = [row[3] for row in enrollment_rows]
+    if lesson_ids:
+        quiz_rows = (
+            db.query(
+                Quiz.lesson_id,
+                Quiz.id,
+                Quiz.title,
+                func.max(QuizSubmission.score),
+                func.count(QuizSubmission.id),
+            )
+            .outerjoin(
+                QuizSubmission,
+                and_(
+                    QuizSubmission.quiz_id == Quiz.id,
+                    QuizSubmission.user_id == user.id,
+                ),
+            )
+            .filter(Quiz.lesson_id.in_(lesson_ids))
+            .group_by(Quiz.lesson_id, Quiz.id, Quiz.title)
+            .order_by(Quiz.id)
+            .all()
+        )
+        # Query 3: totals of this user's archived attempts on the same quizzes
+        archived = {
+            summary.quiz_id: summary
+            for summary in db.query(QuizAttemptSummary).filter(
+                QuizAttemptSummary.user_id == user.id,
+                QuizAttemptSummary.quiz_id.in_([row[1] for row in quiz_rows]),
+            )
+        }
+        for lesson_id, quiz_id, title, best_score, attempts in quiz_rows:
+            summary = archived.get(quiz_id)
+            if summary is not None:
+                attempts += summary.attempts
+                best_score = max(best_score or 0, summary.best_score)
+            quizzes_by_lesson.setdefault(lesson_id, []).append(
+                DashboardQuizScore(
+                    quiz_id=quiz_id,
+                    title=title,
+                    best_score=best_score,
+                    attempts=attempts,
+                )
+            )
+
+    enrollments = [
+        DashboardEnrollment(
+            enrollment_id=enrollment_id,
+            progress_percent=progress,
+            last_accessed=last_accessed,
+            lesson=DashboardLesson(
+                id=lesson_id,
+                title=title,
+                description=description,
+                level=level,
+                duration_minutes=duration,
+            ),
+            quizzes=quizzes_by_lesson.get(lesson_id, []),
+        )
+        for (
+            enrollment_id,
+            progress,
+            last_accessed,
+            lesson_id,
+            title,
+            description,
+            level,
+            duration,
+        ) in enrollment_rows
+    ]
+    total = len(enrollments)
+    return DashboardRead(
+        user=UserRead.model_validate(user),
+        enrollments=enrollments,
+        total_enrollments=total,
+        completed_lessons=sum(1 for e in enrollments if e.progress_percent >= 100),
+        completion_percent=(
+            round(sum(e.progress_percent for e in enrollments) / total, 2) if total else 0
+        ),
+    )
+
+
+@router.get("/me/dashboard", response_model=DashboardRead)
+def read_dashboard(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    dashboard = dashboard_cache.get(current_user.id)
+    if dashboard is None:
+        dashboard = build_dashboard(db, current_user)
+        dashboard_cache.set(current_user.id, dashboard)
+    return dashboard
+
+
+@router.get("/me/recommendations", response_model=list[RecommendedLesson])
+def read_recommendations(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    enrolled = [
+        lesson_id
+        for (lesson_id,) in db.query(Enrollment.lesson_id).filter(
+            Enrollment.user_id == current_user.id
+        )
+    ]
+    return recommended_lessons(db, neighbour_index.recommend(db, enrolled, limit))
+
+
 @router.get("/{user_id}", response_model=UserRead)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_read_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -68,6 +241,7 @@ def update_user(
         setattr(user, field, value)
 
     db.add(user)
+    cache_bus.publish(db, DASHBOARD, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
-from .models import UserRole
+from .models import JobStatus, UserRole
 
 
 class Token(BaseModel):
@@ -74,6 +74,85 @@ class LessonRead(LessonBase):
         from_attributes = True
 
 
+class CatalogQuestion(BaseModel):
+    prompt: str
+    choices: List[str]
+    correct_answer: str
+    explanation: Optional[str] = None
+
+
+class CatalogQuiz(BaseModel):
+    id: Optional[int] = None
+    external_key: Optional[str] = Field(default=None, max_length=255)
+    title: str
+    description: Optional[str] = None
+    duration_minutes: int = 10
+    questions: List[CatalogQuestion] = []
+
+
+class CatalogLesson(LessonBase):
+    """One line of the NDJSON lesson import/export format."""
+
+    id: Optional[int] = None
+    external_key: Optional[str] = Field(default=None, max_length=255)
+    quizzes: List[CatalogQuiz] = []
+
+
+class CatalogImportResult(BaseModel):
+    lessons_created: int = 0
+    lessons_updated: int = 0
+    quizzes_created: int = 0
+    quizzes_updated: int = 0
+    questions: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = []
+    # Source lesson id (the "id" of each line) -> stored lesson id
+    id_map: Dict[int, int] = {}
+
+
+class TagFacet(BaseModel):
+    tag: str
+    # Matching lessons with the tag
+    lessons: int
+
+
+class LessonSuggestion(BaseModel):
+    id: int
+    title: str
+
+
+class TagSuggestion(BaseModel):
+    tag: str
+    # Published lessons with the tag
+    lessons: int
+
+
+class Suggestions(BaseModel):
+    lessons: List[LessonSuggestion]
+    tags: List[TagSuggestion]
+
+
+class TocEntry(BaseModel):
+    level: int
+    id: str
+    title: str
+
+
+class LessonHTMLRead(BaseModel):
+    id: int
+    title: str
+    description: str
+    level: str
+    duration_minutes: int
+    tags: Optional[List[str]] = None
+    is_published: bool
+    created_at: datetime
+    updated_at: datetime
+    content_hash: str
+    html: str
+    toc: List[TocEntry]
+
+
 class EnrollmentBase(BaseModel):
     lesson_id: int
 
@@ -96,6 +175,17 @@ class EnrollmentProgressUpdate(BaseModel):
     progress_percent: float = Field(ge=0, le=100)
 
 
+class ProgressEvent(BaseModel):
+    lesson_id: int
+    progress_percent: float = Field(ge=0, le=100)
+    # When the learner made the progress, on the device's clock
+    client_timestamp: datetime
+
+
+class ProgressSync(BaseModel):
+    events: List[ProgressEvent] = Field(max_length=1000)
+
+
 class QuestionBase(BaseModel):
     prompt: str
     choices: List[str]
@@ -125,6 +215,16 @@ class QuizCreate(QuizBase):
     questions: List[QuestionCreate]
 
 
+class QuestionEdit(QuestionBase):
+    # Omit to add a new question
+    id: Optional[int] = None
+
+
+class QuizQuestionsUpdate(BaseModel):
+    # The quiz's complete question list; stored questions left out are deleted
+    questions: List[QuestionEdit]
+
+
 class QuizUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -149,8 +249,104 @@ class QuizSubmissionRead(BaseModel):
     user_id: int
     score: float
     submitted_at: datetime
-    responses: Dict[int, str]
+    responses: Dict[int, Optional[str]]
 
     class Config:
         from_attributes = True
 
+
+
+class LessonProgressStats(BaseModel):
+    lesson_id: int
+    title: str
+    enrollments: int
+    average: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+    completion_rate: Optional[float] = None
+    # Learners per 10-point progress bin (0-10%, ..., 90-100%)
+    histogram: List[int] = []
+    # Share of learners reaching at least 0%, 10%, ..., 100% (drop-off curve)
+    reached: List[float] = []
+
+
+class ChoiceFrequency(BaseModel):
+    choice: str
+    count: int
+    share: Optional[float] = None
+    is_correct: bool
+
+
+class QuestionAnalysis(BaseModel):
+    question_id: int
+    prompt: str
+    attempts: int = 0
+    # Difficulty: share of attempts answered correctly
+    correct_rate: Optional[float] = None
+    unanswered_rate: Optional[float] = None
+    other_rate: Optional[float] = None
+    # Point-biserial correlation between a correct answer and the total score
+    discrimination: Optional[float] = None
+    choices: List[ChoiceFrequency]
+    flags: List[str] = []
+
+
+class QuizAnalysis(BaseModel):
+    quiz_id: int
+    submissions: int
+    updated_at: Optional[datetime] = None
+    questions: List[QuestionAnalysis]
+
+
+class DashboardLesson(BaseModel):
+    id: int
+    title: str
+    description: str
+    level: str
+    duration_minutes: int
+
+
+class RecommendedLesson(DashboardLesson):
+    score: float
+    co_enrollments: int
+
+
+class DashboardQuizScore(BaseModel):
+    quiz_id: int
+    title: str
+    best_score: Optional[float] = None
+    attempts: int = 0
+
+
+class DashboardEnrollment(BaseModel):
+    enrollment_id: int
+    progress_percent: float
+    last_accessed: datetime
+    lesson: DashboardLesson
+    quizzes: List[DashboardQuizScore]
+
+
+class DashboardRead(BaseModel):
+    user: UserRead
+    enrollments: List[DashboardEnrollment]
+    total_enrollments: int
+    completed_lessons: int
+    completion_percent: float
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
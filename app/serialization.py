@@ -0,0 +1,51 @@
+from typing import Any, Iterable, List, Sequence, Type
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, pydantic-core is always available
+    orjson = None
+
+
+_any_adapter = TypeAdapter(Any)
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize plain dicts/lists straight to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _any_adapter.dump_json(data)
+
+
+def schema_columns(model, schema: Type[BaseModel], exclude: Sequence[str] = ()) -> list:
+    """ORM columns matching the fields of a read schema, in schema order."""
+    return [
+        getattr(model, name) for name in schema.model_fields if name not in exclude
+    ]
+
+
+def rows_to_dicts(rows: Iterable[Sequence[Any]], columns: Sequence[Any]) -> List[dict]:
+    keys = [column.key for column in columns]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def ndjson_chunks(partitions: Iterable[Sequence[Sequence[Any]]], columns: Sequence[Any]):
+    """Encode each partition of rows as one chunk of newline-delimited JSON."""
+    keys = [column.key for column in columns]
+    for rows in partitions:
+        yield b"".join(dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+
+
+class NDJSONResponse(StreamingResponse):
+    media_type = "application/x-ndjson"
+
+
+class FastJSONResponse(Response):
+    """JSON response for pre-shaped rows that skips response_model validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
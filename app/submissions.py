@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from .models import Question, QuizSubmission
+from .schemas import QuizSubmissionRead
+
+
+def grade(questions: Iterable[Question], answers: Dict[int, str]) -> Tuple[float, dict]:
+    """Score an attempt and encode it as choice indices for PackedResponses.
+
+    Answers that are not one of the choices are kept as their text.
+    """
+    questions = list(questions)
+    correct = 0
+    responses = {}
+    for question in questions:
+        answer = answers.get(question.id)
+        if answer is None:
+            responses[question.id] = None
+        elif answer in question.choices:
+            responses[question.id] = question.choices.index(answer)
+        else:
+            responses[question.id] = answer
+        if answer and answer == question.correct_answer:
+            correct += 1
+    return (correct / len(questions)) * 100, responses
+
+
+def response_texts(responses: dict, questions: Iterable[Question]) -> Dict[int, Optional[str]]:
+    """Decode stored responses back to answer texts.
+
+    Packed rows hold choice indices, plus the text of answers that were not
+    a choice; rows written before packing hold only texts. Texts are
+    returned unchanged.
+    """
+    choices = {question.id: question.choices for question in questions}
+    texts = {}
+    for question_id, value in responses.items():
+        if isinstance(value, int):
+            options = choices.get(question_id, [])
+            texts[question_id] = options[value] if 0 <= value < len(options) else None
+        else:
+            texts[question_id] = value
+    return texts
+
+
+def submission_read(submission: QuizSubmission, questions: Iterable[Question]) -> QuizSubmissionRead:
+    return QuizSubmissionRead(
+        id=submission.id,
+        quiz_id=submission.quiz_id,
+        user_id=submission.user_id,
+        score=submission.score,
+        submitted_at=submission.submitted_at,
+        responses=response_texts(submission.responses, questions),
+    )
@@ -0,0 +1,158 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .invalidation import LESSON, cache_bus
+from .models import Lesson
+from .tags import normalize_tag, normalized_tags
+
+WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Casefolded words separated by single spaces; punctuation is dropped."""
+    return " ".join(WORD.findall(text.casefold()))
+
+
+def title_keys(title: str) -> List[str]:
+    """The normalized title from each word on, so any word start can match."""
+    words = normalize(title).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+def _prefix_range(keys: list, prefix: str) -> Iterable:
+    """Entries of a sorted list of (key, ...) tuples whose key starts with prefix."""
+    for i in range(bisect_left(keys, (prefix,)), len(keys)):
+        if not keys[i][0].startswith(prefix):
+            break
+        yield keys[i]
+
+
+class SuggestionIndex:
+    """Sorted arrays of published lesson titles and tags for prefix lookups.
+
+    Titles are matched from their first word, then from any later word;
+    tags from their start. Tags are normalized like the ``tag`` filters
+    (``tags.normalize_tag``), so every suggested tag finds its lessons.
+    Writes in this process update the arrays in place
+    (``upsert``/``remove``). Writes made by other processes are picked up by
+    a full rebuild when the lessons' count or latest ``updated_at`` changes,
+    checked at most every ``refresh_seconds``, so lookups in between never
+    touch the database.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._titles: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        self._tags: List[Tuple[str]] = []
+        self._tag_counts: Dict[str, int] = {}
+        self._lessons: Dict[int, Tuple[str, List[str]]] = {}
+        self._version = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = None
+
+    def _refresh(self, db: Session) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+        version = tuple(db.query(func.count(Lesson.id), func.max(Lesson.updated_at)).one())
+        if version == self._version:
+            return
+        rows = (
+            db.query(Lesson.id, Lesson.title, Lesson.tags)
+            .filter(Lesson.is_published.is_(True))
+            .all()
+        )
+        lessons = {lesson_id: (title, normalized_tags(tags)) for lesson_id, title, tags in rows}
+        titles, words, tag_counts = [], [], {}
+        for lesson_id, (title, tags) in lessons.items():
+            keys = title_keys(title)
+            titles.extend((key, lesson_id) for key in keys[:1])
+            words.extend((key, lesson_id) for key in keys[1:])
+            for tag in tags:
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        titles.sort()
+        words.sort()
+        with self._lock:
+            self._titles, self._words = titles, words
+            self._tags = sorted((tag,) for tag in tag_counts)
+            self._tag_counts = tag_counts
+            self._lessons = lessons
+            self._version = version
+
+    def upsert(self, lesson_id: int, title: str, tags: Optional[list], is_published: bool) -> None:
+        with self._lock:
+            self._remove(lesson_id)
+            if not is_published:
+                return
+            tags = normalized_tags(tags)
+            self._lessons[lesson_id] = (title, tags)
+            keys = title_keys(title)
+            for key in keys[:1]:
+                insort(self._titles, (key, lesson_id))
+            for key in keys[1:]:
+                insort(self._words, (key, lesson_id))
+            for tag in tags:
+                if tag not in self._tag_counts:
+                    insort(self._tags, (tag,))
+                self._tag_counts[tag] = self._tag_counts.get(tag, 0) + 1
+
+    def remove(self, lesson_id: int) -> None:
+        with self._lock:
+            self._remove(lesson_id)
+
+    def _remove(self, lesson_id: int) -> None:
+        indexed = self._lessons.pop(lesson_id, None)
+        if indexed is None:
+            return
+        title, tags = indexed
+        keys = title_keys(title)
+        for entries, entry_keys in ((self._titles, keys[:1]), (self._words, keys[1:])):
+            for key in entry_keys:
+                i = bisect_left(entries, (key, lesson_id))
+                if i < len(entries) and entries[i] == (key, lesson_id):
+                    del entries[i]
+        for tag in tags:
+            self._tag_counts[tag] -= 1
+            if not self._tag_counts[tag]:
+                del self._tag_counts[tag]
+                del self._tags[bisect_left(self._tags, (tag,))]
+
+    def suggest(self, db: Session, query: str, limit: int) -> dict:
+        """Up to ``limit`` lessons (title matches first) and tags starting with ``query``."""
+        self._refresh(db)
+        prefix, tag_prefix = normalize(query), normalize_tag(query)
+        lessons, seen, tags = [], set(), []
+        if not prefix and not tag_prefix:
+            return {"lessons": lessons, "tags": tags}
+        with self._lock:
+            for entries in (self._titles, self._words) if prefix else ():
+                for _, lesson_id in _prefix_range(entries, prefix):
+                    if len(lessons) >= limit:
+                        break
+                    if lesson_id not in seen:
+                        seen.add(lesson_id)
+                        lessons.append({"id": lesson_id, "title": self._lessons[lesson_id][0]})
+            for (tag,) in _prefix_range(self._tags, tag_prefix) if tag_prefix else ():
+                if len(tags) >= limit:
+                    break
+                tags.append({"tag": tag, "lessons": self._tag_counts[tag]})
+        return {"lessons": lessons, "tags": tags}
+
+
+suggestion_index = SuggestionIndex(settings.suggest_refresh_seconds)
+# Lessons written by other processes: re-check the table on the next lookup
+cache_bus.subscribe(LESSON, lambda key: suggestion_index.invalidate(), remote_only=True)
@@ -0,0 +1,105 @@
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Query, Session
+
+from .models import Lesson, LessonTag
+
+MAX_TAG_LENGTH = 100
+BATCH_SIZE = 1000
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(str(tag).split()).lower()[:MAX_TAG_LENGTH]
+
+
+def normalized_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    return sorted({normalize_tag(tag) for tag in tags or []} - {""})
+
+
+def parse_tag_list(value: Optional[str]) -> List[str]:
+    """Tags from a comma-separated query parameter."""
+    return normalized_tags(value.split(",")) if value else []
+
+
+def sync_lesson_tags(lesson: Lesson) -> None:
+    """Make ``lesson.tag_rows`` match ``lesson.tags``, leaving unchanged rows alone."""
+    wanted = set(normalized_tags(lesson.tags))
+    current = {row.tag: row for row in lesson.tag_rows}
+    for tag, row in current.items():
+        if tag not in wanted:
+            lesson.tag_rows.remove(row)
+    for tag in sorted(wanted - current.keys()):
+        lesson.tag_rows.append(LessonTag(tag=tag))
+
+
+def filter_by_tags(query: Query, tags_all: List[str], tags_any: List[str]) -> Query:
+    """Restrict a Lesson query through the lesson_tags index.
+
+    Lessons must have every tag in ``tags_all`` and at least one in ``tags_any``.
+    """
+    if len(tags_all) == 1:
+        query = query.filter(
+            Lesson.id.in_(select(LessonTag.lesson_id).where(LessonTag.tag == tags_all[0]))
+        )
+    elif tags_all:
+        query = query.filter(
+            Lesson.id.in_(
+                select(LessonTag.lesson_id)
+                .where(LessonTag.tag.in_(tags_all))
+                .group_by(LessonTag.lesson_id)
+                .having(func.count() == len(tags_all))
+            )
+        )
+    if tags_any:
+        query = query.filter(
+            Lesson.id.in_(select(LessonTag.lesson_id).where(LessonTag.tag.in_(tags_any)))
+        )
+    return query
+
+
+def tag_facets(db: Session, query: Query, limit: int) -> List[dict]:
+    """The most common tags among the lessons ``query`` matches, with counts."""
+    lesson_ids = query.with_entities(Lesson.id).order_by(None).scalar_subquery()
+    lessons = func.count(LessonTag.lesson_id)
+    rows = (
+        db.query(LessonTag.tag, lessons)
+        .filter(LessonTag.lesson_id.in_(lesson_ids))
+        .group_by(LessonTag.tag)
+        .order_by(lessons.desc(), LessonTag.tag)
+        .limit(limit)
+        .all()
+    )
+    return [{"tag": tag, "lessons": count} for tag, count in rows]
+
+
+def backfill_lesson_tags(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """Rebuild lesson_tags from ``Lesson.tags`` for every lesson, one batch per commit.
+
+    Returns the number of tag rows written. Safe to run repeatedly.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        lessons = (
+            db.query(Lesson.id, Lesson.tags)
+            .filter(Lesson.id > last_id)
+            .order_by(Lesson.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not lessons:
+            return written
+        db.query(LessonTag).filter(
+            LessonTag.lesson_id.in_([lesson_id for lesson_id, _ in lessons])
+        ).delete(synchronize_session=False)
+        rows = [
+            {"lesson_id": lesson_id, "tag": tag}
+            for lesson_id, tags in lessons
+            for tag in normalized_tags(tags)
+        ]
+        if rows:
+            db.execute(insert(LessonTag), rows)
+        db.commit()
+        written += len(rows)
+        last_id = lessons[-1].id
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script to archive old quiz submissions
+Usage: python3 archive_submissions.py <DATABASE_URL> [--older-than-days N]
+Moves submissions older than N days (default SUBMISSION_ARCHIVE_AFTER_DAYS)
+from quiz_submissions to quiz_submissions_archive and updates the per-quiz
+attempt summaries. Safe to run repeatedly, e.g. nightly from cron.
+"""
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def archive(database_url, older_than_days):
+    """Archive submissions in batches, reporting how many rows moved"""
+    try:
+        print("Connecting to database...")
+        engine = create_engine(database_url)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        from app.archive import archive_submissions
+
+        db = SessionLocal()
+        try:
+            result = archive_submissions(db, older_than_days)
+        finally:
+            db.close()
+
+        print(f"✅ Archived {result['archived']} submissions made before {result['cutoff']:%Y-%m-%d}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error archiving submissions: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old quiz submissions")
+    parser.add_argument("database_url", help='Database URL, or "env" to read DATABASE_URL')
+    parser.add_argument("--older-than-days", type=int, default=None)
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url in ("env", "--env"):
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            print("❌ DATABASE_URL environment variable not set")
+            sys.exit(1)
+
+    success = archive(database_url, args.older_than_days)
+    sys.exit(0 if success else 1)
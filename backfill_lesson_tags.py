@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script to backfill the normalized lesson_tags table
+Usage: python3 backfill_lesson_tags.py <DATABASE_URL>
+Creates lesson_tags if it does not exist yet, then rebuilds its rows from
+each lesson's JSON tags in batches. Safe to run repeatedly.
+"""
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def backfill(database_url):
+    """Create lesson_tags and fill it from lessons.tags"""
+    try:
+        print("Connecting to database...")
+        engine = create_engine(database_url)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        from app.models import LessonTag
+        from app.tags import backfill_lesson_tags
+
+        LessonTag.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            written = backfill_lesson_tags(db)
+        finally:
+            db.close()
+
+        print(f"✅ Wrote {written} lesson tags")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error backfilling lesson tags: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 backfill_lesson_tags.py <DATABASE_URL>")
+        print('   or: python3 backfill_lesson_tags.py env')
+        sys.exit(1)
+
+    database_url = sys.argv[1]
+    if database_url in ("env", "--env"):
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            print("❌ DATABASE_URL environment variable not set")
+            sys.exit(1)
+
+    success = backfill(database_url)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark NDJSON lesson export and import.
+Usage: python3 benchmarks/bench_catalog.py [LESSONS]
+Fills a temporary database with synthetic lessons (two quizzes of five
+questions each), exports the catalog to NDJSON, imports it into a second empty
+database, then imports it again to time the upsert-by-external-key path.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP, 'source.db')}"
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.catalog import CatalogImporter, export_lessons  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Lesson, Question, Quiz  # noqa: E402
+
+CONTENT = "# Lesson\n\n" + "Some explanatory text with `code`.\n" * 60
+
+
+def fill(count):
+    db = SessionLocal()
+    db.execute(insert(Lesson), [
+        {"id": i, "external_key": f"lesson-{i}", "title": f"Lesson {i}", "description": "d",
+         "content": CONTENT, "tags": ["js"], "is_published": True}
+        for i in range(1, count + 1)
+    ])
+    db.execute(insert(Quiz), [
+        {"id": i, "lesson_id": (i + 1) // 2, "external_key": f"quiz-{i % 2}", "title": f"Quiz {i}"}
+        for i in range(1, count * 2 + 1)
+    ])
+    db.execute(insert(Question), [
+        {"quiz_id": quiz_id, "prompt": f"Question {n}?", "choices": ["A", "B", "C", "D"],
+         "correct_answer": "A"}
+        for quiz_id in range(1, count * 2 + 1)
+        for n in range(5)
+    ])
+    db.commit()
+    db.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    Base.metadata.create_all(bind=engine)
+    print(f"Creating {count:,} lessons...")
+    fill(count)
+
+    path = os.path.join(TMP, "lessons.ndjson")
+    started = time.perf_counter()
+    with open(path, "wb") as out:
+        for chunk in export_lessons(SessionLocal):
+            out.write(chunk)
+    export_seconds = time.perf_counter() - started
+
+    target = create_engine(f"sqlite:///{os.path.join(TMP, 'target.db')}")
+    Base.metadata.create_all(bind=target)
+    TargetSession = sessionmaker(autocommit=False, autoflush=False, bind=target)
+    timings = []
+    for _ in range(2):
+        importer = CatalogImporter(TargetSession)
+        started = time.perf_counter()
+        with open(path, "rb") as source:
+            importer.feed(source)
+        result = importer.finish()
+        timings.append(time.perf_counter() - started)
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"\n{count:,} lessons, {result.questions:,} questions, {size_mb:.1f} MB NDJSON")
+    print(f"{'step':<24}{'seconds':>10}")
+    print(f"{'export':<24}{export_seconds:>10.2f}")
+    print(f"{'import (insert)':<24}{timings[0]:>10.2f}")
+    print(f"{'import (upsert)':<24}{timings[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes saved and CPU spent per response by gzip/brotli compression
+on realistic lesson detail and quiz list payloads.
+Usage: python3 benchmarks/bench_compression.py [ITERATIONS]
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_lesson_content import markdown_body  # noqa: E402  (also points the app at a scratch DB)
+from app.compression import brotli, compress  # noqa: E402
+
+
+def lesson_payload(i):
+    now = datetime.utcnow().isoformat()
+    return json.dumps({
+        "title": f"Lesson {i}",
+        "description": "Closures and scope",
+        "content": markdown_body(i),
+        "level": "intermediate",
+        "duration_minutes": 45,
+        "tags": ["javascript", "functions"],
+        "is_published": True,
+        "id": i,
+        "created_at": now,
+        "updated_at": now,
+    }, separators=(",", ":")).encode("utf-8")
+
+
+def quiz_list_payload(count):
+    return json.dumps([
+        {
+            "lesson_id": i,
+            "title": f"Quiz {i}",
+            "description": None,
+            "duration_minutes": 10,
+            "id": i,
+            "questions": [
+                {
+                    "prompt": "What does typeof null return?",
+                    "choices": ["null", "object", "undefined", "number"],
+                    "correct_answer": "object",
+                    "explanation": None,
+                    "id": i * 5 + k,
+                }
+                for k in range(5)
+            ],
+        }
+        for i in range(count)
+    ], separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    configs = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+    if brotli is not None:
+        configs += [("br", 4), ("br", 6), ("br", 9), ("br", 11)]
+    else:
+        print("brotli not installed, only gzip is measured")
+
+    payloads = {
+        "lesson detail": [lesson_payload(i) for i in range(10)],
+        "quiz list (50)": [quiz_list_payload(50)],
+    }
+    for name, bodies in payloads.items():
+        raw = sum(len(body) for body in bodies) / len(bodies)
+        print(f"\n{name}: {raw / 1024:.1f}KB uncompressed")
+        print(f"{'encoding':<10}{'level':>6}{'size':>12}{'saved':>9}{'cpu/request':>14}")
+        for encoding, level in configs:
+            started = time.process_time()
+            for _ in range(iterations):
+                sizes = [
+                    len(compress(body, encoding, gzip_level=level, brotli_quality=level))
+                    for body in bodies
+                ]
+            cpu = (time.process_time() - started) / (iterations * len(bodies))
+            size = sum(sizes) / len(sizes)
+            print(f"{encoding:<10}{level:>6}{size / 1024:>10.1f}KB{1 - size / raw:>9.1%}"
+                  f"{cpu * 1_000_000:>12.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark quiz item analysis.
+Usage: python3 benchmarks/bench_item_analysis.py [SUBMISSIONS]
+Fills a temporary database with one 20-question quiz and synthetic packed
+submissions, then times a full analysis (decode every submission into the
+response matrix) and an incremental update after 1,000 new submissions.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.item_analysis import quiz_analysis  # noqa: E402
+from app.models import Lesson, Question, Quiz, QuizSubmission, User, UserRole  # noqa: E402
+
+QUESTIONS = 20
+CHOICES = ["A", "B", "C", "D"]
+
+
+def add_submissions(db, quiz, questions, count, rng):
+    rows = []
+    for _ in range(count):
+        skill = rng.random()
+        responses, correct = {}, 0
+        for question in questions:
+            if rng.random() < 0.03:
+                responses[question.id] = None
+            elif rng.random() < skill:
+                responses[question.id] = 0
+                correct += 1
+            else:
+                responses[question.id] = rng.randrange(1, len(CHOICES))
+        rows.append({
+            "quiz_id": quiz.id,
+            "user_id": 1,
+            "score": correct / len(questions) * 100,
+            "submitted_at": datetime.utcnow(),
+            "responses": responses,
+        })
+    db.execute(insert(QuizSubmission), rows)
+    db.commit()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(40)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(User(id=1, email="bench@example.com", full_name="Bench", role=UserRole.student,
+                hashed_password="x"))
+    lesson = Lesson(title="Bench", description="d", content="c")
+    quiz = Quiz(lesson=lesson, title="Bench quiz")
+    questions = [
+        Question(quiz=quiz, prompt=f"Q{i}", choices=CHOICES, correct_answer="A")
+        for i in range(QUESTIONS)
+    ]
+    db.add_all([lesson, quiz, *questions])
+    db.commit()
+
+    print(f"Creating {count:,} submissions...")
+    for start in range(0, count, 50_000):
+        add_submissions(db, quiz, questions, min(50_000, count - start), rng)
+
+    started = time.perf_counter()
+    analysis = quiz_analysis(db, quiz)
+    full_seconds = time.perf_counter() - started
+
+    add_submissions(db, quiz, questions, 1000, rng)
+    started = time.perf_counter()
+    analysis = quiz_analysis(db, quiz)
+    incremental_seconds = time.perf_counter() - started
+    db.close()
+
+    print(f"\n{analysis.submissions:,} submissions x {QUESTIONS} questions")
+    print(f"{'run':<26}{'seconds':>10}")
+    print(f"{'full analysis':<26}{full_seconds:>10.2f}")
+    print(f"{'incremental (+1,000)':<26}{incremental_seconds:>10.3f}")
+    first = analysis.questions[0]
+    print(f"\nQ1 correct rate {first.correct_rate}, discrimination {first.discrimination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory and I/O of lesson hot paths with deferred, compressed content.
+Usage: python3 benchmarks/bench_lesson_content.py [LESSONS]
+Compares loading Lesson rows with the body eagerly loaded (the previous
+behaviour) against the deferred column, and reports storage saved by compression.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+SECTION = """## Closures in practice
+
+A closure is a function bundled together with references to its surrounding
+state. In JavaScript, closures are created every time a function is created.
+
+```javascript
+function makeCounter(start) {
+  let count = start;
+  return () => ++count;
+}
+const next = makeCounter({n});
+console.log(next()); // {n} + 1
+```
+
+- Closures keep variables alive after the outer function returns
+- Each call to `makeCounter` produces an independent counter
+- Use them for data privacy and partial application
+
+"""
+
+
+WORDS = (
+    "function scope closure variable value object array promise async await "
+    "prototype class module import export event loop callback string number "
+    "boolean undefined null returns creates binds calls handles stores"
+).split()
+
+
+def markdown_body(i):
+    rng = random.Random(i)
+    parts = [f"# Lesson {i}\n\n"]
+    for k in range(25):
+        parts.append(SECTION.replace("{n}", str(rng.randint(0, 10_000))))
+        # Free-form prose so the body is not trivially repetitive
+        parts.append(" ".join(rng.choice(WORDS) for _ in range(60)) + ".\n\n")
+    return "".join(parts)
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<44}{elapsed * 1000:>10.1f}ms{peak / 1024 / 1024:>10.2f}MB")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    from sqlalchemy import func
+    from sqlalchemy.orm import undefer
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import Lesson
+
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    bodies = [markdown_body(i) for i in range(count)]
+    db.add_all(
+        Lesson(
+            title=f"Lesson {i}",
+            description="Closures and scope",
+            content=body,
+            created_at=now,
+            updated_at=now,
+        )
+        for i, body in enumerate(bodies)
+    )
+    db.commit()
+
+    text_bytes = sum(len(body.encode("utf-8")) for body in bodies)
+    stored_bytes = db.query(func.sum(func.length(Lesson.content))).scalar()
+    db.close()
+
+    print(f"\n{count} lessons, {text_bytes / count / 1024:.1f}KB of Markdown each")
+    print(f"Storage: {text_bytes:,} bytes of text -> {stored_bytes:,} bytes stored "
+          f"({stored_bytes / text_bytes:.1%})\n")
+    print(f"{'path':<44}{'time':>12}{'peak':>12}")
+
+    def load_all(eager):
+        def run():
+            session = SessionLocal()
+            query = session.query(Lesson)
+            if eager:
+                query = query.options(undefer(Lesson.content))
+            [lesson.title for lesson in query.all()]
+            session.close()
+        return run
+
+    def lookups(eager):
+        def run():
+            session = SessionLocal()
+            for lesson_id in range(1, count + 1):
+                query = session.query(Lesson).filter(Lesson.id == lesson_id)
+                if eager:
+                    query = query.options(undefer(Lesson.content))
+                query.first().title
+                session.expunge_all()
+            session.close()
+        return run
+
+    measure("admin stats scan, content loaded (before)", load_all(True))
+    measure("admin stats scan, content deferred (after)", load_all(False))
+    measure("per-id lookups, content loaded (before)", lookups(True))
+    measure("per-id lookups, content deferred (after)", lookups(False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark the response_model path against the fast row serialization path
+for large list responses (GET /users, GET /lessons, GET /quizzes).
+Paginated endpoints are walked page by page until all ROWS are fetched.
+Usage: python3 benchmarks/bench_list_serialization.py [ROWS] [REPEAT]
+Requires httpx for the FastAPI test client.
+"""
+import os
+import sys
+import json
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+
+def seed(rows):
+    from app.database import Base, SessionLocal, engine
+    from app.models import Lesson, Question, Quiz, User, UserRole
+
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.execute(
+        User.__table__.insert(),
+        [
+            {
+                "email": f"user{i}@example.com",
+                "full_name": f"User {i}",
+                "role": UserRole.student,
+                "hashed_password": "x" * 60,
+                "bio": "Learning JavaScript",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        Lesson.__table__.insert(),
+        [
+            {
+                "title": f"Lesson {i}",
+                "description": "A short description of the lesson",
+                "content": "# Heading\n\nSome *markdown* content.\n" * 5,
+                "level": "beginner",
+                "duration_minutes": 30,
+                "tags": ["js", "basics"],
+                "is_published": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        Quiz.__table__.insert(),
+        [
+            {"lesson_id": i + 1, "title": f"Quiz {i}", "description": None, "duration_minutes": 10}
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        Question.__table__.insert(),
+        [
+            {
+                "quiz_id": i // 2 + 1,
+                "prompt": "What does typeof null return?",
+                "choices": ["null", "object", "undefined", "number"],
+                "correct_answer": "object",
+                "explanation": None,
+            }
+            for i in range(rows * 2)
+        ],
+    )
+    db.commit()
+    db.close()
+
+
+def timed(client, paths, repeat):
+    best = float("inf")
+    items = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        bodies = [client.get(path).content for path in paths]
+        best = min(best, time.perf_counter() - started)
+        items = [item for body in bodies for item in json.loads(body)]
+    return best, items
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    seed(rows)
+
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.main import app
+    from app.serialization import orjson
+
+    client = TestClient(app)
+    print(f"\n{rows} rows, best of {repeat}, encoder: {'orjson' if orjson else 'pydantic-core'}")
+    print(f"{'endpoint':<12}{'response_model':>16}{'fast path':>12}{'speedup':>10}")
+    pages = range(0, rows, 100)
+    endpoints = {
+        "/users": [f"/users?skip={skip}&limit=100" for skip in pages],
+        "/lessons": ["/lessons?published_only=false"],
+        "/quizzes": [f"/quizzes?skip={skip}&limit=100" for skip in pages],
+    }
+    for name, paths in endpoints.items():
+        settings.fast_json_lists = False
+        slow, slow_items = timed(client, paths, repeat)
+        settings.fast_json_lists = True
+        fast, fast_items = timed(client, paths, repeat)
+        assert slow_items == fast_items, f"{name}: output differs"
+        print(f"{name:<12}{slow * 1000:>14.1f}ms{fast * 1000:>10.1f}ms{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
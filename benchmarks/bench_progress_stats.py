@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark the lesson progress distribution report.
+Usage: python3 benchmarks/bench_progress_stats.py [ENROLLMENTS]
+Fills a temporary SQLite database with synthetic enrollments over 2,000
+lessons (bimodal progress: early drop-off or completion), then times pulling
+the columns into NumPy and the vectorized aggregation separately.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import select  # noqa: E402
+
+from app.analytics import fetch_columns, progress_distribution  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models import Enrollment  # noqa: E402
+
+LESSONS = 2000
+
+
+def fill(count, rng):
+    lessons = rng.integers(1, LESSONS + 1, count)
+    dropped = rng.random(count) < 0.6
+    progress = np.where(dropped, rng.uniform(0, 30, count), rng.uniform(70, 130, count))
+    progress = np.round(np.minimum(progress, 100), 1)
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "CREATE TABLE enrollments (id INTEGER PRIMARY KEY, user_id INTEGER, "
+        "lesson_id INTEGER, progress_percent FLOAT, last_accessed DATETIME)"
+    )
+    conn.executemany(
+        "INSERT INTO enrollments (user_id, lesson_id, progress_percent) VALUES (0, ?, ?)",
+        zip(lessons.tolist(), progress.tolist()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    print(f"Creating {count:,} enrollments...")
+    fill(count, np.random.default_rng(39))
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    rows = fetch_columns(db, select(Enrollment.lesson_id, Enrollment.progress_percent))
+    fetched = time.perf_counter()
+    stats = progress_distribution(rows[:, 0].astype(np.int64), rows[:, 1])
+    finished = time.perf_counter()
+    db.close()
+
+    print(f"\n{count:,} enrollments, {len(stats):,} lessons")
+    print(f"{'step':<24}{'seconds':>10}")
+    print(f"{'fetch columns':<24}{fetched - started:>10.2f}")
+    print(f"{'aggregate (numpy)':<24}{finished - fetched:>10.2f}")
+    print(f"{'total':<24}{finished - started:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of the rate limiting layer.
+Usage: python3 benchmarks/bench_rate_limit.py [CALLS]
+Measures one per-IP check (bucket lookup + refill + take) for each backend,
+spread over 10k distinct client IPs.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from starlette.requests import Request  # noqa: E402
+
+from app.ratelimit import MemoryBackend, SQLiteBackend, rate_limit, set_backend  # noqa: E402
+
+
+def fake_request(ip):
+    return Request({"type": "http", "headers": [], "client": (ip, 50000)})
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    requests = [fake_request(f"10.0.{i // 256}.{i % 256}") for i in range(10_000)]
+    check = rate_limit("bench", per_ip="1000000/second")
+
+    backends = [
+        ("memory", MemoryBackend(), calls),
+        ("sqlite", SQLiteBackend(os.path.join(tempfile.mkdtemp(), "ratelimit.db")), calls // 50),
+    ]
+    print(f"\n{'backend':<10}{'calls':>10}{'per check':>14}")
+    for name, backend, count in backends:
+        set_backend(backend)
+        started = time.perf_counter()
+        for i in range(count):
+            check(requests[i % len(requests)])
+        per_call = (time.perf_counter() - started) / count
+        print(f"{name:<10}{count:>10}{per_call * 1_000_000:>12.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
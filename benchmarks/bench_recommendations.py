@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark the co-enrollment recommendation build.
+Usage: python3 benchmarks/bench_recommendations.py [ENROLLMENTS]
+Builds top-20 neighbours per lesson from synthetic enrollments (popularity
+skewed over 2,000 lessons, ~10 lessons per learner) with the vectorized NumPy
+build, and times the equivalent SQL self-join on SQLite for comparison.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from app.recommendations import top_neighbours  # noqa: E402
+
+LESSONS = 2000
+PER_LEARNER = 10
+
+
+def synthetic_enrollments(count, rng):
+    users = np.arange(count // PER_LEARNER).repeat(PER_LEARNER)
+    weights = 1.0 / np.arange(1, LESSONS + 1)
+    lessons = rng.choice(LESSONS, size=len(users), p=weights / weights.sum())
+    # Enrollments are unique per (user, lesson)
+    pairs = np.unique(users.astype(np.int64) * LESSONS + lessons)
+    return pairs // LESSONS, pairs % LESSONS + 1
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users, lessons = synthetic_enrollments(count, np.random.default_rng(38))
+
+    started = time.perf_counter()
+    rows = top_neighbours(users, lessons, 20)
+    numpy_seconds = time.perf_counter() - started
+
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), "enrollments.db"))
+    conn.execute("CREATE TABLE enrollments (user_id INTEGER, lesson_id INTEGER)")
+    conn.execute("CREATE INDEX ix_enrollments_user ON enrollments (user_id)")
+    conn.executemany(
+        "INSERT INTO enrollments VALUES (?, ?)", zip(users.tolist(), lessons.tolist())
+    )
+    conn.commit()
+    started = time.perf_counter()
+    pairs = conn.execute(
+        "SELECT a.lesson_id, b.lesson_id, COUNT(*) FROM enrollments a "
+        "JOIN enrollments b ON a.user_id = b.user_id AND a.lesson_id != b.lesson_id "
+        "GROUP BY a.lesson_id, b.lesson_id"
+    ).fetchall()
+    sql_seconds = time.perf_counter() - started
+
+    print(f"\n{len(users):,} enrollments, {LESSONS:,} lessons")
+    print(f"{'build':<26}{'seconds':>10}")
+    print(f"{'numpy (top-20 ranked)':<26}{numpy_seconds:>10.2f}")
+    print(f"{'sqlite self-join (counts)':<26}{sql_seconds:>10.2f}")
+    print(f"\n{len(rows):,} neighbour rows from {len(pairs):,} co-enrolled pairs")
+
+
+if __name__ == "__main__":
+    main()
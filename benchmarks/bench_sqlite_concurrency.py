@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent reads and writes on SQLite with the default settings
+(rollback journal, full fsync) against the production profile
+(WAL + tuned pragmas + single in-process writer).
+Usage: python3 benchmarks/bench_sqlite_concurrency.py [SECONDS] [PROCESSES] [THREADS]
+Writers and readers run in separate processes, like multiple uvicorn workers.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH, 'app.db')}"
+
+from sqlalchemy import create_engine, func  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base, configure_sqlite, serialize_writes  # noqa: E402
+from app.models import Enrollment, Lesson, QuizSubmission  # noqa: E402
+
+
+def open_profile(name, tuned):
+    engine = create_engine(
+        f"sqlite:///{os.path.join(SCRATCH, name + '.db')}",
+        connect_args={"check_same_thread": False},
+    )
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if tuned:
+        configure_sqlite(engine)
+        serialize_writes(Session, threading.Lock())
+    return engine, Session
+
+
+def seed(name, tuned):
+    engine, Session = open_profile(name, tuned)
+    Base.metadata.create_all(bind=engine)
+    db = Session()
+    now = datetime.utcnow()
+    db.add_all(
+        Lesson(title=f"Lesson {i}", description="d", content="# Body\n" * 50,
+               created_at=now, updated_at=now)
+        for i in range(50)
+    )
+    db.add_all(Enrollment(user_id=u, lesson_id=u % 50 + 1) for u in range(1, 501))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def write_once(db, n, i):
+    db.add(QuizSubmission(quiz_id=1, user_id=n, score=i % 100, responses={"1": "a"}))
+    enrollment = db.get(Enrollment, (n * 37 + i) % 500 + 1)
+    enrollment.progress_percent = float(i % 100)
+    db.commit()
+
+
+def read_once(db, n, i):
+    db.query(func.count(QuizSubmission.id), func.avg(QuizSubmission.score)).one()
+    db.query(Lesson.id, Lesson.title).filter(Lesson.is_published.is_(True)).all()
+
+
+def worker(name, tuned, role, n, threads, seconds, results):
+    """One process (think: one uvicorn worker) running ``threads`` request threads"""
+    _, Session = open_profile(name, tuned)
+    operation = write_once if role == "writes" else read_once
+    deadline = time.monotonic() + seconds
+    counts = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def loop(t):
+        i = 0
+        while time.monotonic() < deadline:
+            i += 1
+            db = Session()
+            try:
+                operation(db, n * 100 + t, i)
+                key = "ok"
+            except Exception:
+                db.rollback()
+                key = "errors"
+            finally:
+                db.close()
+            with lock:
+                counts[key] += 1
+
+    pool = [threading.Thread(target=loop, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((role, counts["ok"], counts["errors"]))
+
+
+def run(name, tuned, seconds, processes, threads):
+    seed(name, tuned)
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=worker, args=(name, tuned, role, n, threads, seconds, results)
+        )
+        for n in range(processes)
+        for role in ("writes", "reads")
+    ]
+    for process in workers:
+        process.start()
+    totals = {"writes": 0, "reads": 0, "errors": 0}
+    for _ in workers:
+        role, ok, errors = results.get()
+        totals[role] += ok
+        totals["errors"] += errors
+    for process in workers:
+        process.join()
+    return totals
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    print(f"\n{processes} writer + {processes} reader processes x {threads} threads, "
+          f"{seconds:.0f}s per profile")
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'errors':>8}")
+    for name, tuned in (("default", False), ("production", True)):
+        totals = run(name, tuned, seconds, processes, threads)
+        print(f"{name:<12}{totals['writes'] / seconds:>10.0f}{totals['reads'] / seconds:>10.0f}"
+              f"{totals['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark storage used by quiz submission responses.
+Usage: python3 benchmarks/bench_submission_storage.py [SUBMISSIONS]
+Encodes synthetic submissions (10-question quizzes, four choices each, ~5%
+unanswered) both as the previous JSON answer-text object and as
+PackedResponses, and reports the bytes per submission and the reduction.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from app.models import PackedResponses  # noqa: E402
+
+QUIZZES = 500
+QUESTIONS_PER_QUIZ = 10
+CHOICES = [
+    "A closure over the enclosing scope",
+    "A new execution context",
+    "The global object",
+    "undefined",
+]
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(36)
+    packed_type = PackedResponses()
+
+    json_bytes = packed_bytes = 0
+    json_seconds = packed_seconds = 0.0
+    for i in range(submissions):
+        first_question = (i % QUIZZES) * QUESTIONS_PER_QUIZ + 1
+        indices = {}
+        for question_id in range(first_question, first_question + QUESTIONS_PER_QUIZ):
+            indices[question_id] = None if rng.random() < 0.05 else rng.randrange(len(CHOICES))
+        texts = {
+            str(question_id): None if index is None else CHOICES[index]
+            for question_id, index in indices.items()
+        }
+
+        started = time.perf_counter()
+        json_bytes += len(json.dumps(texts).encode("utf-8"))
+        json_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        packed_bytes += len(packed_type.process_bind_param(indices, None))
+        packed_seconds += time.perf_counter() - started
+
+    print(f"\n{submissions:,} submissions x {QUESTIONS_PER_QUIZ} questions")
+    print(f"{'format':<10}{'total':>16}{'per row':>12}{'encode':>14}")
+    for name, size, seconds in (
+        ("json", json_bytes, json_seconds),
+        ("packed", packed_bytes, packed_seconds),
+    ):
+        print(
+            f"{name:<10}{size / 1e6:>13.1f} MB{size / submissions:>10.1f} B"
+            f"{seconds / submissions * 1e6:>11.2f} us"
+        )
+    print(f"\nreduction: {1 - packed_bytes / json_bytes:.1%} ({json_bytes / packed_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark lesson autocomplete.
+Usage: python3 benchmarks/bench_suggest.py [LESSONS]
+Fills a temporary database with synthetic published lessons, then compares
+GET /lessons?search= style ilike queries with prefix lookups in the
+in-memory suggestion index, for every prefix of a few typed words.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Lesson  # noqa: E402
+from app.suggest import SuggestionIndex  # noqa: E402
+
+WORDS = (
+    "async arrays closures promises objects functions modules events generators iterators "
+    "classes prototypes scope hoisting fetch streams workers regex dates errors testing "
+    "intro advanced deep dive patterns practical guide basics mastering"
+).split()
+TYPED = ["promises", "closures", "deep dive", "testing", "xyz"]
+CONTENT = "# Lesson\n\n" + "Some explanatory text.\n" * 200
+
+
+def fill(count, rng):
+    db = SessionLocal()
+    db.execute(insert(Lesson), [
+        {"title": " ".join(rng.sample(WORDS, 4)).title() + f" {i}", "description": "d",
+         "content": CONTENT, "tags": rng.sample(WORDS, 2)}
+        for i in range(count)
+    ])
+    db.commit()
+    db.close()
+
+
+def timed(calls):
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    Base.metadata.create_all(bind=engine)
+    print(f"Creating {count:,} lessons...")
+    fill(count, random.Random(46))
+    prefixes = [word[:n] for word in TYPED for n in range(1, len(word) + 1)] * 20
+
+    db = SessionLocal()
+    index = SuggestionIndex(refresh_seconds=3600)
+    started = time.perf_counter()
+    index.suggest(db, "warm", 8)
+    build_seconds = time.perf_counter() - started
+
+    scan = timed(
+        lambda prefix=prefix: db.query(Lesson).filter(
+            Lesson.title.ilike(f"%{prefix}%"), Lesson.is_published.is_(True)
+        ).limit(8).all()
+        for prefix in prefixes
+    )
+    lookup = timed(lambda prefix=prefix: index.suggest(db, prefix, 8) for prefix in prefixes)
+    db.close()
+
+    print(f"\n{count:,} lessons, {len(prefixes):,} keystrokes, index built in {build_seconds:.2f}s")
+    print(f"{'lookup':<24}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'ilike scan':<24}{scan[0]:>10.3f}{scan[1]:>10.3f}")
+    print(f"{'prefix index':<24}{lookup[0]:>10.3f}{lookup[1]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
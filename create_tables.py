@@ -15,7 +15,11 @@ def create_tables(database_url):
         
         print("Importing models...")
         from app.database import Base
-        from app.models import User, Lesson, Quiz, Question, Enrollment, QuizSubmission
+        from app.models import (
+            User, Lesson, LessonRender, LessonTag, Quiz, Question, Enrollment, QuizSubmission,
+            ArchivedQuizSubmission, QuizAttemptSummary, QuizItemAnalysis, QuestionStats,
+            LessonNeighbour, IdempotencyKey, Job, CacheInvalidation, CacheGeneration,
+        )
         
         print("Creating tables...")
         Base.metadata.create_all(bind=engine)
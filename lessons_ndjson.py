@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Script to export and import the lesson catalog as NDJSON
+Usage: python3 lessons_ndjson.py export <DATABASE_URL> [FILE]
+       python3 lessons_ndjson.py import <DATABASE_URL> FILE
+Each line is one lesson with its quizzes and their questions. Export writes to
+stdout when FILE is omitted. Import upserts lessons by external_key in chunked
+transactions and prints how source ids were remapped; use "-" to read stdin.
+"""
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+def export_catalog(database_url, path):
+    """Stream every lesson to FILE (or stdout)"""
+    try:
+        engine = create_engine(database_url)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        from app.catalog import export_lessons
+
+        out = open(path, "wb") if path else sys.stdout.buffer
+        lines = 0
+        try:
+            for chunk in export_lessons(SessionLocal):
+                out.write(chunk)
+                lines += chunk.count(b"\n")
+        finally:
+            if path:
+                out.close()
+
+        print(f"✅ Exported {lines} lessons", file=sys.stderr)
+        return True
+
+    except Exception as e:
+        print(f"❌ Error exporting lessons: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def import_catalog(database_url, path):
+    """Upsert lessons from FILE, reporting counts and rejected lines"""
+    try:
+        print("Connecting to database...")
+        engine = create_engine(database_url)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        from app.catalog import CatalogImporter
+
+        importer = CatalogImporter(SessionLocal)
+        source = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            importer.feed(source)
+        finally:
+            if path != "-":
+                source.close()
+        result = importer.finish()
+
+        for error in result.errors:
+            print(f"   line {error['line']}: {error['detail']}")
+        print(
+            f"✅ Lessons: {result.lessons_created} created, {result.lessons_updated} updated; "
+            f"quizzes: {result.quizzes_created} created, {result.quizzes_updated} updated; "
+            f"{result.questions} questions"
+        )
+        if result.failed:
+            print(f"❌ {result.failed} lines were rejected")
+        return result.failed == 0
+
+    except Exception as e:
+        print(f"❌ Error importing lessons: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import lessons as NDJSON")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("database_url", help='Database URL, or "env" to read DATABASE_URL')
+    parser.add_argument("file", nargs="?", help="NDJSON file (import: required, - for stdin)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url in ("env", "--env"):
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            print("❌ DATABASE_URL environment variable not set")
+            sys.exit(1)
+
+    if args.command == "export":
+        success = export_catalog(database_url, args.file)
+    elif not args.file:
+        parser.error("import needs a FILE")
+    else:
+        success = import_catalog(database_url, args.file)
+    sys.exit(0 if success else 1)
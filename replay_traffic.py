@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Script to replay captured traffic and report latency percentiles per route
+Usage: python3 replay_traffic.py CAPTURE [CAPTURE ...] [--url URL] [--speed X]
+                                 [--concurrency N] [--users N] [--seed N]
+CAPTURE files are JSONL written with TRAFFIC_CAPTURE_ENABLED=true, rotated
+files included. Requests keep their captured spacing divided by --speed
+(0 sends them as fast as --concurrency allows). Without --url the app is
+driven in-process against DATABASE_URL, with rate limiting off. Captured
+callers are mapped onto a seeded pool of --users mentor accounts plus one
+admin, which are created and logged in first; each pool user sends its own
+X-Forwarded-For address. Against a URL, set RATE_LIMIT_TRUST_FORWARDED_FOR
+or disable rate limiting on the target. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+PASSWORD = "replay-password"
+PLACEHOLDER = re.compile(r"^<str:(\d+)>$")
+# Starlette path converters, e.g. {path:path}
+CONVERTER = re.compile(r"{(\w+):\w+}")
+
+
+def load_records(paths):
+    """All records from the given files, oldest first"""
+    records = []
+    for path in paths:
+        with open(path) as source:
+            records.extend(json.loads(line) for line in source if line.strip())
+    return sorted(records, key=lambda record: record["at"])
+
+
+def fill(value, key, rng):
+    """Turn a captured body shape back into a valid body"""
+    if isinstance(value, dict):
+        return {k: fill(v, k, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(item, None, rng) for item in value]
+    if value == "<redacted>":
+        return PASSWORD
+    if value == "<datetime>":
+        return datetime.now(timezone.utc).isoformat()
+    if isinstance(value, str):
+        match = PLACEHOLDER.match(value)
+        if match:
+            if key == "email":
+                return f"replay-{rng.getrandbits(48):012x}@example.com"
+            return "x" * int(match.group(1))
+    return value
+
+
+def percentile(samples, share):
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+class UserPool:
+    """Seeded replay accounts standing in for captured callers"""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.users = []
+        self.admin = None
+        self._assigned = {}
+
+    async def _account(self, client, email, role, address):
+        headers = {"X-Forwarded-For": address}
+        response = await client.post(
+            "/users",
+            json={"email": email, "full_name": "Replay User", "password": PASSWORD, "role": role},
+            headers=headers,
+        )
+        if response.status_code not in (201, 400):
+            raise RuntimeError(f"Creating {email} failed: {response.status_code} {response.text}")
+        response = await client.post(
+            "/auth/token", data={"username": email, "password": PASSWORD}, headers=headers
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Logging in {email} failed: {response.status_code} {response.text}")
+        headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return {"email": email, "headers": headers}
+
+    async def setup(self, client):
+        for i in range(self.size):
+            address = f"10.{self.seed % 256}.{i // 256}.{i % 256}"
+            self.users.append(await self._account(
+                client, f"replay-{self.seed}-{i}@example.com", "mentor", address
+            ))
+        self.admin = await self._account(
+            client, f"replay-{self.seed}-admin@example.com", "admin", f"10.{self.seed % 256}.255.255"
+        )
+        self.rng.shuffle(self.users)
+
+    def user_for(self, alias):
+        """Captured callers get pool users round-robin, in order of first appearance"""
+        if alias not in self._assigned:
+            self._assigned[alias] = self.users[len(self._assigned) % len(self.users)]
+        return self._assigned[alias]
+
+
+def build_request(record, pool, rng):
+    """(method, path, httpx keyword arguments), or None when the record can't be replayed"""
+    from app.loadshed import route_class
+
+    if record["route"] is None:
+        return None
+    path = CONVERTER.sub(r"{\1}", record["route"]).format(**record["path_params"])
+    kwargs = {"params": {k: v for k, v in record["query"].items() if v != "<redacted>"}}
+    if not record["user"]:
+        # Anonymous requests (sign-ups, logins, public reads) come from a random pool address
+        user = rng.choice(pool.users)
+        kwargs["headers"] = {"X-Forwarded-For": user["headers"]["X-Forwarded-For"]}
+    else:
+        # Jobs are polled by the admins whose reports started them
+        admin = route_class(record["method"], path) == "admin" or path.startswith("/jobs")
+        user = pool.admin if admin else pool.user_for(record["user"])
+        kwargs["headers"] = dict(user["headers"])
+
+    body = record["body"]
+    if body is None:
+        pass
+    elif "json" in body:
+        kwargs["json"] = fill(body["json"], None, rng)
+    elif "form" in body:
+        kwargs["data"] = {key: "x" for key in body["form"]}
+        if "username" in kwargs["data"]:
+            kwargs["data"].update(username=user["email"], password=PASSWORD)
+    else:
+        # Uploads and oversized bodies are captured by size only
+        return None
+    return record["method"], path, kwargs
+
+
+async def replay(client, records, pool, speed, concurrency, rng):
+    import httpx
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    skipped = 0
+
+    async def send(key, method, path, kwargs):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                status = (await client.request(method, path, **kwargs)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[key].append((time.perf_counter() - started) * 1000)
+            statuses[key][status] += 1
+
+    tasks = []
+    first = records[0]["at"]
+    started = time.perf_counter()
+    for record in records:
+        request = build_request(record, pool, rng)
+        if request is None:
+            skipped += 1
+            continue
+        if speed:
+            delay = (record["at"] - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        key = (record["method"], record["route"])
+        tasks.append(asyncio.create_task(send(key, *request)))
+    await asyncio.gather(*tasks)
+    return latencies, statuses, skipped, time.perf_counter() - started
+
+
+def report(records, latencies, statuses, skipped, elapsed):
+    captured = defaultdict(list)
+    for record in records:
+        captured[(record["method"], record["route"])].append(record["duration_ms"])
+
+    sent = sum(len(samples) for samples in latencies.values())
+    print(f"Sent {sent} requests in {elapsed:.1f}s ({sent / elapsed:.1f}/s), skipped {skipped}")
+    print(f"{'route':<48} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'captured p50':>13}  statuses")
+    for key, samples in sorted(latencies.items(), key=lambda item: -len(item[1])):
+        samples.sort()
+        original = sorted(captured[key])
+        codes = ", ".join(f"{status}×{count}" for status, count in statuses[key].most_common())
+        print(
+            f"{key[0] + ' ' + key[1]:<48} {len(samples):>6} {percentile(samples, 0.5):>8.1f} "
+            f"{percentile(samples, 0.95):>8.1f} {percentile(samples, 0.99):>8.1f} "
+            f"{percentile(original, 0.5):>13.1f}  {codes}"
+        )
+
+
+async def run(args):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        os.environ.setdefault("TRAFFIC_CAPTURE_ENABLED", "false")
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=args.timeout)
+
+    records = load_records(args.captures)
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        print("❌ No records to replay")
+        return False
+
+    async with client:
+        pool = UserPool(args.users, args.seed)
+        print(f"Preparing {args.users} replay users...")
+        await pool.setup(client)
+        pace = f"at {args.speed:g}x speed" if args.speed else "without delays"
+        print(f"Replaying {len(records)} records {pace}, concurrency {args.concurrency}...")
+        results = await replay(
+            client, records, pool, args.speed, args.concurrency, random.Random(args.seed)
+        )
+    report(records, *results)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic against the app")
+    parser.add_argument("captures", nargs="+", help="Capture JSONL files")
+    parser.add_argument("--url", help="Base URL to replay against (default: the app in-process)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor, 0 for no delays")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20, help="Size of the replay user pool")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    try:
+        success = asyncio.run(run(args))
+    except Exception as e:
+        print(f"❌ Error replaying traffic: {e}")
+        import traceback
+        traceback.print_exc()
+        success = False
+    sys.exit(0 if success else 1)
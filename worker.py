@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Background job worker
+Usage: python3 worker.py [--concurrency N] [--poll-interval SECONDS] [--once]
+Runs queued jobs (admin reports, lesson deletions, ...) from the jobs table
+using the DATABASE_URL the API is configured with.
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+
+def work(worker_id, poll_interval, once, stop):
+    """Claim and run jobs until stopped, sleeping when the queue is empty"""
+    from app.database import SessionLocal
+    from app.jobs import run_pending
+
+    while not stop.is_set():
+        try:
+            ran = run_pending(SessionLocal, worker_id)
+        except Exception as e:
+            print(f"❌ {worker_id}: {e}", file=sys.stderr)
+            ran = 0
+        if once:
+            return
+        if ran == 0:
+            stop.wait(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+    args = parser.parse_args()
+
+    # Importing the routers registers every job handler
+    import app.routers  # noqa: F401
+
+    stop = threading.Event()
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(f"{base_id}:{i}", args.poll_interval, args.once, stop),
+            daemon=True,
+        )
+        for i in range(args.concurrency)
+    ]
+    print(f"Starting {args.concurrency} worker thread(s)...")
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        stop.set()
+        for thread in threads:
+            thread.join()
+    print("✅ Worker stopped")
+
+
+if __name__ == "__main__":
+    main()